@@ -0,0 +1,47 @@
+import re
+
+segment_finder = re.compile(r'[A-Z]+(?=[A-Z][a-z]|[0-9]|$)|[A-Z]?[a-z]+|[0-9]+')
+
+
+def abbreviate(name):
+    """The initials of each camel hump and underscore separated segment of
+    `name`, keeping numbers whole, e.g. HttpResponseRedirect is HRR and
+    get_object_or_404 is goo404."""
+    initials = []
+    for part in name.split('_'):
+        for segment in segment_finder.findall(part):
+            initials.append(segment if segment.isdigit() else segment[0])
+    return ''.join(initials)
+
+
+def abbreviation_key(name):
+    """The lower cased abbreviation `name` is found under, None for names
+    that are their own abbreviation."""
+    abbreviation = abbreviate(name).lower()
+    if abbreviation and abbreviation != name.lower():
+        return abbreviation
+    return None
+
+
+def build_abbreviations(names):
+    """Map lower cased abbreviations to the names they abbreviate."""
+    abbreviations = {}
+    for name in names:
+        abbreviation = abbreviation_key(name)
+        if abbreviation is not None:
+            abbreviations.setdefault(abbreviation, []).append(name)
+    for names in abbreviations.values():
+        names.sort()
+    return abbreviations
+
+
+def rank_abbreviation_matches(query, names, data):
+    """Order the names matching `query`: names whose initials match the
+    query's case first, then names with more import paths, then shorter
+    names."""
+    def key(name):
+        return (abbreviate(name) != query,
+                -len(data.get(name) or []),
+                len(name),
+                name)
+    return sorted(names, key=key)
@@ -0,0 +1,58 @@
+"""asyncio lookups for services that embed indj (python 3.5+)."""
+import asyncio
+from .handlers import LookupHandler
+
+
+class AsyncLookup(object):
+    """Looks names up without blocking the event loop.
+
+    Indexes load in an executor, and concurrent requests for a version that
+    is still loading wait on the same load instead of starting their own.
+    Once loaded an index is kept, so later queries are plain dict lookups.
+    """
+
+    def __init__(self, settings, executor=None):
+        self.settings = settings
+        self.executor = executor
+        self._loaded = {}
+        self._loading = {}
+
+    def get_handler(self, version):
+        return LookupHandler(version, self.settings)
+
+    def _finish(self, version, future):
+        self._loading.pop(version, None)
+        if not future.cancelled() and future.exception() is None:
+            self._loaded[version] = future.result()
+
+    async def get_index_data(self, version):
+        version = tuple(version)
+        if version in self._loaded:
+            return self._loaded[version]
+        future = self._loading.get(version)
+        if future is None:
+            loop = asyncio.get_event_loop()
+            future = loop.run_in_executor(
+                self.executor, self.get_handler(version).get_index_data)
+            future.add_done_callback(
+                lambda done: self._finish(version, done))
+            self._loading[version] = future
+        # shielded so a cancelled request doesn't cancel the load the other
+        # requests are waiting on
+        return await asyncio.shield(future)
+
+    async def preload(self, versions):
+        await asyncio.gather(
+            *[self.get_index_data(version) for version in versions])
+
+    async def lookup(self, name, version):
+        data = await self.get_index_data(version)
+        return list(data.get(name, []))
+
+    async def lookup_many(self, names, version):
+        data = await self.get_index_data(version)
+        return dict((name, list(data.get(name, []))) for name in names)
+
+    def forget(self, version):
+        """Drop a loaded index so the next query loads it again."""
+        self._loaded.pop(tuple(version), None)
@@ -0,0 +1,49 @@
+import base64
+import hashlib
+import math
+import struct
+
+
+class BloomFilter(object):
+    """A fixed size Bloom filter over index names.
+
+    Positions come from md5 so a filter written by one process can be read
+    by another regardless of hash randomisation.
+    """
+
+    def __init__(self, size, hashes, bits=None):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bits if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        capacity = max(capacity, 1)
+        size = int(math.ceil(
+            -capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hashes = max(1, int(round(size / float(capacity) * math.log(2))))
+        return cls(size, hashes)
+
+    def _positions(self, name):
+        digest = hashlib.md5(name.encode('utf-8')).digest()
+        first, second = struct.unpack('<QQ', digest)
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, name):
+        for position in self._positions(name):
+            self.bits[position // 8] |= 1 << (position % 8)
+
+    def __contains__(self, name):
+        return all(self.bits[position // 8] & (1 << (position % 8))
+                   for position in self._positions(name))
+
+    def to_dict(self):
+        return {'size': self.size,
+                'hashes': self.hashes,
+                'bits': base64.b64encode(bytes(self.bits)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        bits = bytearray(base64.b64decode(data['bits'].encode('ascii')))
+        return cls(data['size'], data['hashes'], bits)
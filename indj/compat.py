@@ -0,0 +1,146 @@
+import json
+import os
+import re
+from . import utils
+from .index import DjangoJson
+
+
+class DjangoCompat(object):
+    """Which django versions each (name, import path) pair appears in.
+
+    Every indexed version gets a bit, in version order, and each pair keeps
+    an integer with the bits of the versions it was found in, so questions
+    about version ranges never need to open the per version indexes.
+    """
+
+    index_finder = re.compile(r'^django-.*\.json$')
+
+    def __init__(self, filepath, settings):
+        self.filepath = filepath
+        self.settings = settings
+        self.versions = []
+        self.sources = {}
+        self.data = {}
+
+    def get_index_filepaths(self):
+        """The index file for every version, taken from the first data
+        directory that has it like a lookup would."""
+        filepaths = {}
+        for directory in self.settings.DATA_DIRECTORIES:
+            try:
+                filenames = sorted(os.listdir(directory))
+            except OSError:
+                continue
+            for filename in filenames:
+                if self.index_finder.match(filename):
+                    filepaths.setdefault(
+                        filename, os.path.join(directory, filename))
+        return filepaths
+
+    def get_sources(self):
+        return dict((filepath, utils.file_signature(filepath))
+                    for filepath in self.get_index_filepaths().values())
+
+    def build(self):
+        indexes = []
+        for filepath in self.get_index_filepaths().values():
+            django_json = DjangoJson(filepath, self.settings)
+            version = django_json.get_header().get('version')
+            if version is None:
+                version = django_json.get_version()
+            indexes.append((tuple(version), django_json))
+        indexes.sort(key=lambda index: utils.version_sort_key(index[0]))
+
+        self.versions = [version for version, _ in indexes]
+        self.sources = self.get_sources()
+        self.data = {}
+        for bit, (_, django_json) in enumerate(indexes):
+            # indexes are streamed one at a time so only the compatibility
+            # data itself is ever held in memory
+            for name, paths in django_json.iter_index_data():
+                name_data = self.data.setdefault(name, {})
+                for path in paths:
+                    name_data[path] = name_data.get(path, 0) | (1 << bit)
+        return self
+
+    def save(self):
+        with utils.atomic_open(self.filepath) as fh:
+            json.dump({'versions': self.versions,
+                       'sources': self.sources,
+                       'data': self.data}, fh)
+
+    def load(self):
+        with open(self.filepath, 'r') as fh:
+            compat = json.load(fh)
+        self.versions = [tuple(version) for version in compat['versions']]
+        self.sources = compat['sources']
+        self.data = compat['data']
+        return self
+
+    @property
+    def is_current(self):
+        return self.sources == self.get_sources()
+
+    def load_or_build(self):
+        """Load the saved compatibility index, rebuilding and saving it when
+        any index has been added, removed or changed since."""
+        try:
+            self.load()
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+        else:
+            if self.is_current:
+                return self
+        self.build()
+        self.save()
+        return self
+
+    def _bits_to_versions(self, bits, start=None, end=None):
+        # bounds are compared with as many parts of the version as they
+        # give, so 1-8 covers every 1.8 release
+        start_key = utils.version_sort_key(start) if start else None
+        end_key = utils.version_sort_key(end) if end else None
+        versions = []
+        for bit, version in enumerate(self.versions):
+            if not bits & (1 << bit):
+                continue
+            key = utils.version_sort_key(version)
+            if start_key is not None and key[:len(start_key)] < start_key:
+                continue
+            if end_key is not None and key[:len(end_key)] > end_key:
+                continue
+            versions.append(version)
+        return versions
+
+    def get_bits(self, name, path=None):
+        name_data = self.data.get(name, {})
+        if path is not None:
+            return name_data.get(path, 0)
+        bits = 0
+        for path_bits in name_data.values():
+            bits |= path_bits
+        return bits
+
+    def get_versions(self, name, path=None, start=None, end=None):
+        """Versions with `name`, at `path` if given, between `start` and
+        `end` inclusive."""
+        return self._bits_to_versions(self.get_bits(name, path), start, end)
+
+    def get_paths(self, name):
+        return dict((path, self._bits_to_versions(bits))
+                    for path, bits in self.data.get(name, {}).items())
+
+    def available_since(self, name, path=None):
+        versions = self.get_versions(name, path)
+        return versions[0] if versions else None
+
+    def removed_in(self, name, path=None):
+        """The first version after the last one with `name`, None when it is
+        still in the newest indexed version or was never there."""
+        bits = self.get_bits(name, path)
+        if not bits:
+            return None
+        last = bits.bit_length() - 1
+        if last + 1 < len(self.versions):
+            return self.versions[last + 1]
+        return None
@@ -0,0 +1,158 @@
+import fnmatch
+import glob
+import hashlib
+import os
+from . import utils
+from .exceptions import LookupHandlerError
+from .handlers import CreationHandler, LookupHandler
+from .index import DjangoSrc
+
+SITE_PACKAGES_PATTERNS = [
+    os.path.join('lib', 'python*', 'site-packages'),
+    os.path.join('lib64', 'python*', 'site-packages'),
+    os.path.join('Lib', 'site-packages'),
+]
+
+
+class DjangoInstall(object):
+
+    def __init__(self, site_packages, version, settings):
+        self.site_packages = site_packages
+        self.directory = os.path.join(site_packages, 'django')
+        self.version = version
+        self.settings = settings
+        self._digest = None
+
+    @property
+    def digest(self):
+        """A hash of the files an index would be built from, only worked out
+        when two installs claim the same version."""
+        if self._digest is None:
+            django_src = DjangoSrc(self.directory, self.settings)
+            digest = hashlib.sha1()
+            for filepath in sorted(django_src.get_filepaths()):
+                relpath = os.path.relpath(filepath, self.directory)
+                digest.update(relpath.encode('utf-8'))
+                with open(filepath, 'rb') as fh:
+                    digest.update(hashlib.sha1(fh.read()).digest())
+            self._digest = digest.hexdigest()
+        return self._digest
+
+
+def find_site_packages(environment):
+    """site-packages directories of a virtualenv, or the directory itself if
+    it already is one."""
+    if os.path.isdir(os.path.join(environment, 'django')):
+        return [environment]
+    found = []
+    for pattern in SITE_PACKAGES_PATTERNS:
+        found.extend(sorted(glob.glob(os.path.join(environment, pattern))))
+    return found
+
+
+def read_metadata_version(site_packages):
+    """The django version recorded by pip in dist-info or egg-info metadata."""
+    try:
+        filenames = os.listdir(site_packages)
+    except OSError:
+        return None
+    for filename in sorted(filenames):
+        lowered = filename.lower()
+        if fnmatch.fnmatch(lowered, 'django-*.dist-info'):
+            metadata = os.path.join(site_packages, filename, 'METADATA')
+        elif fnmatch.fnmatch(lowered, 'django-*.egg-info'):
+            metadata = os.path.join(site_packages, filename, 'PKG-INFO')
+        else:
+            continue
+        try:
+            with open(metadata, 'r') as fh:
+                for line in fh:
+                    if line.startswith('Version:'):
+                        return utils.version_from_release(
+                            line.split(':', 1)[1].strip())
+                    if not line.strip():
+                        break
+        except (IOError, OSError):
+            continue
+    return None
+
+
+def find_install(site_packages, settings):
+    """The django in `site_packages`, found without importing it."""
+    directory = os.path.join(site_packages, 'django')
+    if not os.path.isfile(os.path.join(directory, '__init__.py')):
+        return None
+    try:
+        version = utils.read_django_version(directory)
+    except (IOError, OSError, SyntaxError, ValueError):
+        version = None
+    if version is None:
+        version = read_metadata_version(site_packages)
+    if version is None:
+        return None
+    return DjangoInstall(site_packages, version, settings)
+
+
+class DiscoveryHandler(object):
+    """Finds django in many environments and makes sure every distinct
+    version has an index."""
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def find_installs(self, environments):
+        installs = []
+        for environment in environments:
+            for site_packages in find_site_packages(environment):
+                install = find_install(site_packages, self.settings)
+                if install is not None:
+                    installs.append(install)
+        return installs
+
+    def dedupe(self, installs):
+        """Split installs into those to index, one per version, and those that
+        are copies of them. An install with the same version but different
+        files is returned as a conflict, since indexes are keyed by version."""
+        unique, duplicates, conflicts = [], [], []
+        by_version = {}
+        for install in installs:
+            first = by_version.get(install.version)
+            if first is None:
+                by_version[install.version] = install
+                unique.append(install)
+            elif first.digest == install.digest:
+                duplicates.append(install)
+            else:
+                conflicts.append(install)
+        return unique, duplicates, conflicts
+
+    def get_existing_filepath(self, version):
+        try:
+            return LookupHandler(version, self.settings).get_filepath()
+        except LookupHandlerError:
+            return None
+
+    def build(self, install):
+        directory = self.settings.JSON_OUTPUT_DIRECTORY
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        creation = CreationHandler(install.directory, self.settings)
+        return creation.save_django_index(creation.get_django_src())
+
+    def index(self, environments, dry_run=False):
+        """Yield `(install, status, filepath)` for every django found, where
+        status is one of reused, built, duplicate or conflict."""
+        unique, duplicates, conflicts = self.dedupe(
+            self.find_installs(environments))
+        for install in unique:
+            filepath = self.get_existing_filepath(install.version)
+            if filepath is not None:
+                yield install, 'reused', filepath
+            elif dry_run:
+                yield install, 'missing', None
+            else:
+                yield install, 'built', self.build(install)
+        for install in duplicates:
+            yield install, 'duplicate', None
+        for install in conflicts:
+            yield install, 'conflict', None
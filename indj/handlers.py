@@ -1,8 +1,17 @@
 import os
 from datetime import datetime
 from indj import utils
-from indj.index import DjangoIndex, DjangoSrc
-from indj.exceptions import LookupHandlerError
+from indj.abbrev import rank_abbreviation_matches
+from indj.suffix import find_suffix, rank_suffix_matches
+from indj.trace import span
+from indj.index import (
+    DjangoIndex, DjangoIndexWriter, DjangoSrc, DjangoJson, DjangoSummary,
+    ProjectSrc)
+from indj.compat import DjangoCompat
+from indj.pack import load_packaged, write_pack
+from indj import shared
+from indj.tags import DjangoTags
+from indj.exceptions import DjangoIndexError, LookupHandlerError
 
 
 class LookupHandler(object):
@@ -10,6 +19,7 @@ class LookupHandler(object):
     def __init__(self, version, settings):
         self.settings = settings
         self.version = version
+        self.index_format = None
 
     def get_filepath(self):
         for directory in self.settings.DATA_DIRECTORIES:
@@ -20,8 +30,133 @@ class LookupHandler(object):
             'No data file could be found for django version `{0}`'.format(
                 utils.version_as_string(self.version)))
 
-    def get_django_json(self):
-        return DjangoSrc()
+    def get_django_json(self, filepath=None):
+        return DjangoJson(filepath or self.get_filepath(), self.settings)
+
+    def get_django_pack(self):
+        return load_packaged(self.version)
+
+    def get_shared_pack(self):
+        if not self.settings.SHARED_INDEX:
+            return None
+        return shared.attach(self.version, self.settings)
+
+    def get_index_data(self):
+        """The data of the index for this version as something with a dict
+        like `get`, from the shared pack if there is one and falling back to
+        the index bundled with indj."""
+        shared_pack = self.get_shared_pack()
+        if shared_pack is not None:
+            return shared_pack
+        try:
+            return self.get_django_json().get_index_data()
+        except LookupHandlerError:
+            django_pack = self.get_django_pack()
+            if django_pack is None:
+                raise
+            return django_pack
+
+    def get_summary(self, directory):
+        return DjangoSummary(directory, self.settings)
+
+    def might_contain(self, name, filepath=None):
+        """False only when `name` is definitely not in the index, going by
+        the bloom filter in its header."""
+        django_json = self.get_django_json(filepath)
+        try:
+            bloom = django_json.get_bloom_filter()
+        except (DjangoIndexError, ValueError, KeyError, TypeError):
+            return True
+        return bloom is None or name in bloom
+
+    def lookup(self, name):
+        if self.settings.SHARED_INDEX:
+            with span('shared'):
+                shared_pack = self.get_shared_pack()
+                if shared_pack is not None:
+                    self.index_format = 'shared'
+                    return shared_pack.get(name, [])
+        with span('get_filepath'):
+            try:
+                filepath = self.get_filepath()
+            except LookupHandlerError:
+                # bundled indexes are queried in place, even from a zip
+                django_pack = self.get_django_pack()
+                if django_pack is None:
+                    raise
+                filepath = None
+        if filepath is None:
+            self.index_format = 'pack'
+            with span('pack'):
+                return django_pack.get(name, [])
+        self.index_format = 'json'
+        # most misses are answered by the bloom filter at the start of the
+        # index so the rest of it is only loaded when the name is probably
+        # there
+        with span('bloom'):
+            if not self.might_contain(name, filepath):
+                return []
+        django_json = self.get_django_json(filepath)
+        with span('parse'):
+            django_json.data
+        with span('index'):
+            django_index = self.get_django_index(django_json)
+        return django_index.data.get(name, [])
+
+    def get_lookup_pack(self):
+        """The shared pack if there is one, else None when there is a JSON
+        index, else the bundled pack."""
+        shared_pack = self.get_shared_pack()
+        if shared_pack is not None:
+            return shared_pack
+        try:
+            self.get_filepath()
+        except LookupHandlerError:
+            django_pack = self.get_django_pack()
+            if django_pack is None:
+                raise
+            return django_pack
+        return None
+
+    def get_abbreviation_data(self):
+        """The index data and its abbreviations."""
+        django_pack = self.get_lookup_pack()
+        if django_pack is not None:
+            return django_pack, django_pack.get_abbreviations()
+        django_json = self.get_django_json()
+        return django_json.get_index_data(), django_json.get_abbreviations()
+
+    def get_suffix_data(self):
+        """The index data and its sorted reversed import paths."""
+        django_pack = self.get_lookup_pack()
+        if django_pack is not None:
+            return django_pack, django_pack.get_suffixes()
+        django_json = self.get_django_json()
+        return django_json.get_index_data(), django_json.get_suffixes()
+
+    def lookup_abbreviation(self, query):
+        """Ranked `(name, paths)` pairs for names abbreviated by `query`,
+        e.g. HRR for HttpResponseRedirect."""
+        data, abbreviations = self.get_abbreviation_data()
+        names = abbreviations.get(query.lower(), [])
+        return [(name, data.get(name, []))
+                for name in rank_abbreviation_matches(query, names, data)]
+
+    def lookup_suffix(self, query):
+        """Import paths ending in the dotted `query`, e.g. models.Q, with
+        exact suffix matches first."""
+        name = query.rsplit('.', 1)[-1]
+        data, suffixes = self.get_suffix_data()
+        exact = find_suffix(suffixes, query)
+        return rank_suffix_matches(query, exact, data.get(name) or [])
+
+    def get_probable_versions(self, name):
+        versions = []
+        for directory in self.settings.DATA_DIRECTORIES:
+            for version in self.get_summary(directory).probable_versions(name):
+                if version not in versions:
+                    versions.append(version)
+        return versions
 
     def get_django_index(self, django_json):
         return DjangoIndex(
@@ -53,3 +188,234 @@ class CreationHandler(object):
             version=django_src.get_version(),
             created=datetime.now(),
             settings=self.settings)
+
+    def save_django_index(self, django_src, overwrite=False):
+        writer = DjangoIndexWriter(
+            version=django_src.get_version(),
+            created=datetime.now(),
+            settings=self.settings)
+        return writer.write(
+            self.get_definitions_generator(django_src),
+            overwrite=overwrite,
+            rank=django_src.rank_paths)
+
+
+class StackedLookupHandler(LookupHandler):
+    """Looks names up in project overlay indexes as well as the django index
+    for the version, combining the results as the settings ask."""
+
+    def __init__(self, version, settings, overlays=None):
+        super(StackedLookupHandler, self).__init__(version, settings)
+        if overlays is None:
+            overlays = settings.OVERLAY_FILEPATHS
+        self.overlays = overlays
+        self._layer_data = {}
+
+    def read_overlay(self, filepath, read):
+        """`read` applied to the overlay index at `filepath`, raising
+        LookupHandlerError if the overlay is missing or unreadable."""
+        try:
+            return read(DjangoJson(filepath, self.settings))
+        except (IOError, OSError, ValueError) as e:
+            raise LookupHandlerError(
+                'Could not read overlay `{0}`: {1}'.format(filepath, e))
+
+    def lookup_overlay(self, filepath, name):
+        def read(django_json):
+            bloom = django_json.get_bloom_filter()
+            if bloom is not None and name not in bloom:
+                return []
+            return django_json.get_index_data().get(name, [])
+        with span('overlay'):
+            return self.read_overlay(filepath, read)
+
+    def _in_precedence(self, overlays, base):
+        if self.settings.OVERLAY_PRECEDENCE == 'base':
+            return base + overlays
+        return overlays + base
+
+    def get_layers(self, errors):
+        """Lookup functions for every layer in precedence order. A missing
+        django index gives no paths and its error is added to `errors`."""
+        overlays = [
+            lambda name, filepath=filepath: self.lookup_overlay(filepath, name)
+            for filepath in self.overlays]
+
+        def base(name):
+            try:
+                return super(StackedLookupHandler, self).lookup(name)
+            except LookupHandlerError as e:
+                errors.append(e)
+                return []
+        return self._in_precedence(overlays, [base])
+
+    def _merge(self, layer_paths):
+        paths = []
+        for layer in layer_paths:
+            if layer and self.settings.OVERLAY_MERGE == 'shadow':
+                return list(layer)
+            paths.extend(path for path in layer if path not in paths)
+        return paths
+
+    def lookup(self, name):
+        # a missing django index only matters when no overlay has the name
+        errors = []
+        paths = self._merge(layer(name) for layer in self.get_layers(errors))
+        if errors and not paths:
+            raise errors[0]
+        return paths
+
+    def get_tables(self, get_base, get_overlay):
+        """`(data, table)` for every layer in precedence order, and the error
+        from loading the django index if it is missing but there are
+        overlays."""
+        overlays = [self.read_overlay(filepath, get_overlay)
+                    for filepath in self.overlays]
+        try:
+            base, error = [get_base()], None
+        except LookupHandlerError as e:
+            if not overlays:
+                raise
+            base, error = [], e
+        return self._in_precedence(overlays, base), error
+
+    def lookup_abbreviation(self, query):
+        layers, error = self.get_tables(
+            super(StackedLookupHandler, self).get_abbreviation_data,
+            lambda django_json: (django_json.get_index_data(),
+                                 django_json.get_abbreviations()))
+        names = []
+        for _, abbreviations in layers:
+            names.extend(name for name in abbreviations.get(query.lower(), [])
+                         if name not in names)
+        if error is not None and not names:
+            raise error
+        data = dict(
+            (name, self._merge(layer.get(name) or [] for layer, _ in layers))
+            for name in names)
+        return [(name, data[name])
+                for name in rank_abbreviation_matches(query, names, data)]
+
+    def lookup_suffix(self, query):
+        layers, error = self.get_tables(
+            super(StackedLookupHandler, self).get_suffix_data,
+            lambda django_json: (django_json.get_index_data(),
+                                 django_json.get_suffixes()))
+        name = query.rsplit('.', 1)[-1]
+        exact = []
+        for _, suffixes in layers:
+            exact.extend(path for path in find_suffix(suffixes, query)
+                         if path not in exact)
+        paths = self._merge(layer.get(name) or [] for layer, _ in layers)
+        matches = rank_suffix_matches(query, exact, paths)
+        if error is not None and not matches:
+            raise error
+        return matches
+
+    def get_layer_data(self):
+        """The index data of every layer in precedence order, loaded once
+        per handler. Without a django index only the overlays are used."""
+        if None not in self._layer_data:
+            try:
+                self._layer_data[None] = super(
+                    StackedLookupHandler, self).get_index_data()
+            except LookupHandlerError:
+                if not self.overlays:
+                    raise
+                self._layer_data[None] = {}
+        for filepath in self.overlays:
+            if filepath not in self._layer_data:
+                self._layer_data[filepath] = self.read_overlay(
+                    filepath, DjangoJson.get_index_data)
+        layers = [self._layer_data[filepath] for filepath in self.overlays]
+        return self._in_precedence(layers, [self._layer_data[None]])
+
+    def lookup_many(self, names):
+        layers = self.get_layer_data()
+        return dict(
+            (name, self._merge(layer.get(name, []) for layer in layers))
+            for name in names)
+
+
+class OverlayHandler(object):
+
+    def __init__(self, src, settings, filepath=None):
+        self.settings = settings
+        self.src = src
+        if filepath is None:
+            filepath = os.path.join(src, settings.OVERLAY_FILENAME)
+        self.filepath = filepath
+
+    def get_project_src(self):
+        return ProjectSrc(self.src, self.settings)
+
+    def save_overlay(self):
+        project_src = self.get_project_src()
+        writer = DjangoIndexWriter(
+            version=project_src.get_version(),
+            created=datetime.now(),
+            settings=self.settings)
+        generator = project_src.definitions_generator(
+            project_src.get_filepaths())
+        return writer.write(
+            generator,
+            overwrite=True,
+            rank=project_src.rank_paths,
+            filepath=self.filepath)
+
+
+class ExportHandler(LookupHandler):
+
+    def get_django_tags(self, filepath, src=None):
+        return DjangoTags(filepath, self.settings, self.get_source_directory(src))
+
+    def get_source_directory(self, src=None):
+        """The django source to take tag locations from: `src`, which has to
+        be the version being exported, or else the installed django when it
+        is that version."""
+        if src is None:
+            if self.settings.DJANGO_VERSION != tuple(self.version):
+                return None
+            return self.settings.DJANGO_DIRECTORY
+        try:
+            src_version = utils.read_django_version(src)
+        except (IOError, OSError):
+            src_version = None
+        if src_version != tuple(self.version):
+            raise LookupHandlerError(
+                'The django in `{0}` is not version `{1}`'.format(
+                    src, utils.version_as_string(self.version)))
+        return src
+
+    def export_pack(self, filepath):
+        return write_pack(self.get_django_json(), filepath, self.settings)
+
+    def export_tags(self, filepath, overwrite=False, src=None):
+        django_json = DjangoJson(self.get_filepath(), self.settings)
+        return self.get_django_tags(filepath, src).write(
+            django_json, overwrite=overwrite)
+
+
+class SharedHandler(LookupHandler):
+
+    def publish(self, overwrite=False):
+        return shared.publish(self.get_django_json(), self.settings, overwrite)
+
+    def unpublish(self):
+        return shared.unpublish(self.version, self.settings)
+
+
+class CompatHandler(object):
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def get_filepath(self):
+        return os.path.join(
+            self.settings.JSON_OUTPUT_DIRECTORY, self.settings.COMPAT_FILENAME)
+
+    def get_django_compat(self):
+        directory = self.settings.JSON_OUTPUT_DIRECTORY
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        return DjangoCompat(self.get_filepath(), self.settings).load_or_build()
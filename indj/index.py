@@ -1,13 +1,26 @@
+import ast
 import json
 import jedi
 import fnmatch
+import heapq
 import os
 import re
 import datetime
+import tempfile
+from collections import OrderedDict
+from .abbrev import abbreviation_key, build_abbreviations
+from .bloom import BloomFilter
 from .exceptions import DjangoIndexError
+from .suffix import build_suffixes, reverse_path
 from . import utils
 
 
+_DEFINITION_NODES = tuple(
+    getattr(ast, node_type)
+    for node_type in ['ClassDef', 'FunctionDef', 'AsyncFunctionDef']
+    if hasattr(ast, node_type))
+
+
 class DjangoIndex(object):
 
     def __init__(self, data, version, created, settings):
@@ -20,6 +33,20 @@ class DjangoIndex(object):
     def names(self):
         return sorted(list(self.data.keys()))
 
+    def add_definitions(self, definitions):
+        for name, path in definitions:
+            paths = self.data.setdefault(name, [])
+            if path not in paths:
+                paths.append(path)
+
+    def remove_definitions(self, definitions):
+        for name, path in definitions:
+            paths = self.data.get(name, [])
+            if path in paths:
+                paths.remove(path)
+            if not paths:
+                self.data.pop(name, None)
+
     def validate(self):
         if not self.data:
             raise DjangoIndexError('Given index is empty or None')
@@ -30,10 +57,29 @@ class DjangoIndex(object):
         if not isinstance(self.data, dict):
             raise DjangoIndexError('Data is not a dict')
 
+    def get_bloom_filter(self):
+        bloom = BloomFilter.for_capacity(
+            len(self.data), self.settings.BLOOM_ERROR_RATE)
+        for name in self.data:
+            bloom.add(name)
+        return bloom
+
+    def get_abbreviations(self):
+        return build_abbreviations(self.data)
+
+    def get_suffixes(self):
+        return build_suffixes(
+            path for paths in self.data.values() for path in paths)
+
     def to_dict(self):
-        return {'data': self.data,
-                'version': self.version,
-                'created': self.created}
+        # everything but the data, abbreviations and suffixes goes first so it
+        # can be read without parsing the rest of the file
+        return OrderedDict([('bloom', self.get_bloom_filter().to_dict()),
+                            ('version', self.version),
+                            ('created', self.created),
+                            ('data', self.data),
+                            ('abbreviations', self.get_abbreviations()),
+                            ('suffixes', self.get_suffixes())])
 
     @property
     def is_valid(self):
@@ -44,35 +90,194 @@ class DjangoIndex(object):
         return True
 
     def save(self, overwrite=False):
-        data_directory = self.settings.JSON_OUTPUT_DIRECTORY
-        data_filepath = utils.data_filepath_from_version(
-            data_directory, self.version)
+        data_filepath = _output_filepath(self.settings, self.version, overwrite)
+        with utils.atomic_open(data_filepath) as fh:
+            json.dump(self.to_dict(), fh, default=utils.json_serialize)
+        DjangoSummary(os.path.dirname(data_filepath), self.settings).refresh()
 
-        if not os.path.exists(data_directory):
-            raise DjangoIndexError('Output directory does not exist')
 
-        if os.path.exists(data_filepath) and not overwrite:
-            raise DjangoIndexError('Output file already exists')
+class DjangoIndexWriter(object):
 
-        with open(data_filepath, 'w') as fh:
-            json.dump(self.to_dict(), fh, default=utils.json_serialize)
+    def __init__(self, version, created, settings):
+        self.version = version
+        self.created = created
+        self.settings = settings
+        self._buffer = []
+        self._runs = []
+        self._count = 0
+
+    def add(self, name, path, is_definition=False):
+        # the running count keeps import paths for a name in the order they
+        # were found once the runs have been sorted by name, whether the
+        # path's module defines the name is only known as it is read so it
+        # is carried along for ranking
+        self._buffer.append((name, self._count, path, is_definition))
+        self._count += 1
+        if len(self._buffer) >= self.settings.INDEX_WRITER_BUFFER_SIZE:
+            self._spill()
+
+    def _spill(self):
+        if not self._buffer:
+            return
+        self._buffer.sort()
+        run = tempfile.TemporaryFile(mode='w+')
+        for entry in self._buffer:
+            run.write(json.dumps(entry))
+            run.write('\n')
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = []
+
+    def _read_run(self, run):
+        run.seek(0)
+        for line in run:
+            yield tuple(json.loads(line))
+
+    def _merged(self):
+        self._buffer.sort()
+        runs = [self._read_run(run) for run in self._runs]
+        runs.append(iter(self._buffer))
+        return heapq.merge(*runs)
+
+    def _grouped_definitions(self):
+        current_name = None
+        paths = []
+        definitions = set()
+        for name, _, path, is_definition in self._merged():
+            if name != current_name:
+                if paths:
+                    yield current_name, paths, definitions
+                current_name = name
+                paths = []
+                definitions = set()
+            if path not in paths:
+                paths.append(path)
+            if is_definition:
+                definitions.add(path)
+        if paths:
+            yield current_name, paths, definitions
+
+    def grouped(self):
+        for name, paths, _ in self._grouped_definitions():
+            yield name, paths
+
+    def close(self):
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+        self._count = 0
+
+    def _bloom_filter(self, abbreviations):
+        # one merge counts the distinct names to size the filter and a second
+        # fills it, sorting the names by abbreviation as it goes
+        count = sum(1 for _ in self.grouped())
+        bloom = BloomFilter.for_capacity(count, self.settings.BLOOM_ERROR_RATE)
+        for name, _ in self.grouped():
+            bloom.add(name)
+            abbreviation = abbreviation_key(name)
+            if abbreviation is not None:
+                abbreviations.add(abbreviation, name)
+        return bloom
+
+    def _data_items(self, rank, suffixes):
+        for name, paths, definitions in self._grouped_definitions():
+            if rank is not None:
+                paths = rank(name, paths, definitions)
+            for path in paths:
+                suffixes.add(reverse_path(path), '')
+            yield '{0}: {1}'.format(json.dumps(name), json.dumps(paths))
+
+    def write(self, generator, overwrite=False, rank=None, filepath=None):
+        """Write `(name, path)` or `(name, path, is_definition)` items as an
+        index. `rank(name, paths, definitions)` orders the paths of a name,
+        given those whose module defines it."""
+        if filepath is None:
+            data_filepath = _output_filepath(
+                self.settings, self.version, overwrite)
+        else:
+            data_filepath = filepath
+            if os.path.exists(data_filepath) and not overwrite:
+                raise DjangoIndexError('Output file already exists')
+        # abbreviations and suffixes go through spill and merge sorters of
+        # their own so nothing held in memory grows with the index
+        abbreviations = DjangoIndexWriter(None, None, self.settings)
+        suffixes = DjangoIndexWriter(None, None, self.settings)
+        try:
+            for definition in generator:
+                self.add(*definition)
+            bloom = self._bloom_filter(abbreviations)
+            with utils.atomic_open(data_filepath) as fh:
+                fh.write('{"bloom": ')
+                fh.write(json.dumps(bloom.to_dict()))
+                fh.write(', "version": ')
+                fh.write(json.dumps(self.version))
+                fh.write(', "created": ')
+                fh.write(json.dumps(self.created, default=utils.json_serialize))
+                fh.write(', "data": {')
+                _write_joined(fh, self._data_items(rank, suffixes))
+                fh.write('}, "abbreviations": {')
+                _write_joined(fh, (
+                    '{0}: {1}'.format(json.dumps(abbreviation), json.dumps(names))
+                    for abbreviation, names in abbreviations.grouped()))
+                fh.write('}, "suffixes": [')
+                _write_joined(fh, (
+                    json.dumps(suffix) for suffix, _ in suffixes.grouped()))
+                fh.write(']}')
+        finally:
+            self.close()
+            abbreviations.close()
+            suffixes.close()
+        if filepath is None:
+            DjangoSummary(
+                os.path.dirname(data_filepath), self.settings).refresh()
+        return data_filepath
+
+
+def _write_joined(fh, items):
+    for i, item in enumerate(items):
+        if i:
+            fh.write(', ')
+        fh.write(item)
+
+
+def _output_filepath(settings, version, overwrite):
+    data_directory = settings.JSON_OUTPUT_DIRECTORY
+    data_filepath = utils.data_filepath_from_version(data_directory, version)
+
+    if not os.path.exists(data_directory):
+        raise DjangoIndexError('Output directory does not exist')
+
+    if os.path.exists(data_filepath) and not overwrite:
+        raise DjangoIndexError('Output file already exists')
+
+    return data_filepath
 
 
 class DjangoSrc(object):
 
-    version_finder = re.compile(r'^VERSION\s*=\s*(.*)$', re.MULTILINE)
+    version_finder = utils.version_finder
+    # import paths are built relative to this package
+    package = 'django'
 
     def __init__(self, src, settings):
         self.src = src
         self.settings = settings
+        # `__all__` and the imports of every module read, to rank paths and
+        # follow re-exports once all are read, while the names a module
+        # defines are only kept for the last one read
+        self.modules = {}
+        self._last_defined = (None, set())
 
     def _file_is_magic(self, path):
         return os.path.basename(path).startswith('__') and path.endswith('__.py')
 
     def _get_import_path(self, full_name, module_import_path):
-        if full_name.startswith('django.') or full_name == 'django':
+        if self.package and (full_name == self.package or
+                             full_name.startswith(self.package + '.')):
             return full_name
-        return '{path}.{name}'.format(path=module_import_path, name=full_name)
+        return '.'.join(
+            part for part in [module_import_path, full_name] if part)
 
     def _get_module_import_path(self, module_path):
         abs_module_path = os.path.abspath(module_path)
@@ -90,19 +295,137 @@ class DjangoSrc(object):
         if relpath in ['.', '..']:
             relpath = ''
 
-        return 'django{dot}{path}'.format(
-            dot='.' if relpath else '',
-            path=relpath.replace(os.path.sep, '.'))
+        return '.'.join(
+            part for part in [self.package, relpath.replace(os.path.sep, '.')]
+            if part)
+
+    def _get_relative_import_base(self, module_import_path, is_package, level):
+        parts = module_import_path.split('.')
+        if not is_package:
+            parts = parts[:-1]
+        if level > 1:
+            parts = parts[:-(level - 1)]
+        return '.'.join(parts)
+
+    def _get_module_info(self, source, module_import_path, is_package):
+        info = {'defined': set(), 'all': None, 'imports': {}}
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, TypeError, ValueError):
+            return info
+
+        for node in tree.body:
+            if isinstance(node, _DEFINITION_NODES):
+                info['defined'].add(node.name)
+            elif isinstance(node, (ast.Assign, ast.AugAssign)):
+                self._add_assignment_info(info, node)
+            elif isinstance(node, ast.ImportFrom):
+                self._add_import_info(
+                    info, node, module_import_path, is_package)
+        return info
+
+    def _add_assignment_info(self, info, node):
+        targets = getattr(node, 'targets', None) or [node.target]
+        for target in targets:
+            if not isinstance(target, ast.Name):
+                continue
+            if target.id != '__all__':
+                info['defined'].add(target.id)
+                continue
+            try:
+                names = set(ast.literal_eval(node.value))
+            except (ValueError, TypeError, SyntaxError):
+                continue
+            info['all'] = (info['all'] or set()) | names
+
+    def _add_import_info(self, info, node, module_import_path, is_package):
+        module = node.module or ''
+        if node.level:
+            base = self._get_relative_import_base(
+                module_import_path, is_package, node.level)
+            module = '.'.join(part for part in [base, module] if part)
+        for alias in node.names:
+            info['imports'][alias.asname or alias.name] = (module, alias.name)
 
     def _get_definitions_from_file(self, path):
         with open(path, 'r') as fh:
-            defs = jedi.defined_names(fh.read())
+            source = fh.read()
+        defs = jedi.defined_names(source)
         module_import_path = self._get_module_import_path(path)
+        info = self._get_module_info(
+            source, module_import_path, self._file_is_magic(path))
+        self._last_defined = (module_import_path, info.pop('defined'))
+        self.modules[module_import_path] = info
         items = [
             (d.name, self._get_import_path(d.full_name, module_import_path), )
             for d in defs]
         return items
 
+    def _get_origin(self, name, module_import_path):
+        # follow `from x import name` re-exports back to the defining module
+        seen = set()
+        while (module_import_path, name) not in seen:
+            seen.add((module_import_path, name))
+            info = self.modules.get(module_import_path)
+            if info is None or name not in info['imports']:
+                break
+            module_import_path, name = info['imports'][name]
+        return module_import_path, name
+
+    def is_definition(self, name, path):
+        """Whether the module of the import `path` defines `name` itself
+        rather than importing it. Only known for the file read last, so ask
+        before reading the next."""
+        module_import_path = path.rpartition('.')[0]
+        last_module, defined = self._last_defined
+        if module_import_path != last_module:
+            defined = (self.modules.get(module_import_path) or {}).get(
+                'defined', ())
+        return name in defined
+
+    def _rank_key(self, name, path, definitions=None):
+        module_import_path = path.rpartition('.')[0]
+        parts = module_import_path.split('.')
+        info = self.modules.get(module_import_path)
+        in_all = bool(info and info['all'] and name in info['all'])
+        if definitions is None:
+            is_definition = self.is_definition(name, path)
+        else:
+            is_definition = path in definitions
+        is_private = any(part.startswith('_') for part in parts)
+        return (is_private, not in_all, len(parts), not is_definition)
+
+    def rank_paths(self, name, paths, definitions=None):
+        """Order `paths` so the preferred import path comes first.
+
+        Paths that resolve to the same definition are kept together and
+        ordered by the best path among them. Within that, public modules
+        beat private ones, modules listing the name in `__all__` beat those
+        that don't, shallower paths beat deeper ones, and the defining module
+        beats a re-export. Ties keep the order the paths were found in.
+        `definitions` are the paths whose module defines `name`, as found by
+        is_definition while each file was read.
+        """
+        keys = dict((path, self._rank_key(name, path, definitions))
+                    for path in paths)
+        origins = dict(
+            (path, self._get_origin(name, path.rpartition('.')[0]))
+            for path in paths)
+        best = {}
+        for path in paths:
+            origin = origins[path]
+            if origin not in best or keys[path] < best[origin]:
+                best[origin] = keys[path]
+        return sorted(
+            paths, key=lambda path: (best[origins[path]], keys[path]))
+
+    def rank_index_data(self, data, definitions=None):
+        for name, paths in data.items():
+            if len(paths) > 1:
+                data[name] = self.rank_paths(
+                    name, paths, definitions.get(name) if definitions else None)
+        return data
+
     def get_filepaths(self):
         filepaths = []
         exclude_folders_pattern = utils.join_regexp(
@@ -124,31 +447,115 @@ class DjangoSrc(object):
         return filepaths
 
     def get_version(self):
-        path = os.path.join(self.src, '__init__.py')
-        with open(path, 'r') as fh:
-            contents = fh.read()
-            matches = self.version_finder.search(contents)
-            version = matches.group(1)
-        return eval(version)
+        return utils.read_django_version(self.src)
 
     def definitions_generator(self, filepaths):
+        """Yield `(name, path, is_definition)` for every definition."""
         for path in filepaths:
-            for item in self._get_definitions_from_file(path):
-                yield item
+            for name, import_path in self._get_definitions_from_file(path):
+                yield name, import_path, self.is_definition(name, import_path)
 
     def create_index_data(self, generator=None):
         if not generator:
             filepaths = self.get_filepaths()
             generator = self.definitions_generator(filepaths)
         data = {}
-        for name, path in generator:
+        definitions = {}
+        for definition in generator:
+            name, path = definition[:2]
             print(name)
             if name in data:
                 if path not in data[name]:
                     data[name].append(path)
             else:
                 data[name] = [path]
-        return data
+            if any(definition[2:]):
+                definitions.setdefault(name, set()).add(path)
+        return self.rank_index_data(data, definitions)
+
+
+class _JsonStream(object):
+    """Reads the values of a top level JSON object from a file handle a
+    chunk at a time."""
+
+    chunk_size = 65536
+
+    def __init__(self, fh, chunk_size=None):
+        self.fh = fh
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.fh.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def _peek(self):
+        while True:
+            while (self.position < len(self.buffer) and
+                   self.buffer[self.position].isspace()):
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.eof:
+                raise DjangoIndexError('Unexpected end of index file')
+            self._fill()
+
+    def expect(self, char):
+        if self._peek() != char:
+            raise DjangoIndexError(
+                'Expected `{0}` in index file'.format(char))
+        self.position += 1
+
+    def next_is(self, char):
+        if self._peek() == char:
+            self.position += 1
+            return True
+        return False
+
+    def decode(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                value, end = None, None
+            # a value ending at the edge of the buffer may be a truncated
+            # number, so only trust it once something follows it
+            if end is not None and (end < len(self.buffer) or self.eof):
+                self.position = end
+                return value
+            if self.eof:
+                raise DjangoIndexError('Invalid index file')
+            self._fill()
+
+    def items(self):
+        self.expect('{')
+        if self.next_is('}'):
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            if self.next_is('}'):
+                return
+            self.expect(',')
+
+
+class ProjectSrc(DjangoSrc):
+    """A project's own source tree, indexed with import paths relative to
+    the project root so it can be layered over a django index."""
+
+    package = None
+
+    def get_version(self):
+        return self.settings.DJANGO_VERSION
 
 
 class DjangoJson(object):
@@ -168,11 +575,154 @@ class DjangoJson(object):
     def get_index_data(self):
         return self.data['data']
 
+    def iter_index_data(self):
+        """Yield `(name, paths)` pairs without loading the whole file."""
+        if self._data is not None:
+            for item in self._data['data'].items():
+                yield item
+            return
+        with open(self.filepath, 'r') as fh:
+            stream = _JsonStream(fh)
+            for key in stream.items():
+                if key != 'data':
+                    stream.decode()
+                    continue
+                for name in stream.items():
+                    yield name, stream.decode()
+                return
+
+    def get_abbreviations(self):
+        """Abbreviations stored in the index, worked out from the names for
+        indexes written without them."""
+        if 'abbreviations' in self.data:
+            return self.data['abbreviations']
+        return build_abbreviations(self.get_index_data())
+
+    def get_suffixes(self):
+        """Reversed import paths stored in the index, worked out from the data
+        for indexes written without them."""
+        if 'suffixes' in self.data:
+            return self.data['suffixes']
+        return build_suffixes(
+            path for paths in self.get_index_data().values() for path in paths)
+
+    def get_header(self):
+        """Read the values stored ahead of the data without parsing the
+        data itself."""
+        if self._data is not None:
+            return dict((key, value) for key, value in self._data.items()
+                        if key != 'data')
+        header = {}
+        with open(self.filepath, 'r') as fh:
+            stream = _JsonStream(fh, chunk_size=4096)
+            for key in stream.items():
+                if key == 'data':
+                    break
+                header[key] = stream.decode()
+        return header
+
+    def get_bloom_filter(self):
+        bloom = self.get_header().get('bloom')
+        return BloomFilter.from_dict(bloom) if bloom else None
+
     def get_version(self):
         return tuple(self.data['version'])
 
     def get_created(self):
-        created = datetime.datetime.strptime(
-            self.data['created'],
-            '%Y-%m-%dT%H:%M:%S')
-        return created
+        # indexes created with datetime.now() carry microseconds
+        created = self.data['created']
+        created_format = '%Y-%m-%dT%H:%M:%S'
+        if '.' in created:
+            created_format += '.%f'
+        return datetime.datetime.strptime(created, created_format)
+
+
+class DjangoSummary(object):
+    """The bloom filters of every index in a data directory, kept in one small
+    file so names missing from every version can be ruled out without opening
+    any of the indexes."""
+
+    index_finder = re.compile(r'^django-.*\.json$')
+
+    def __init__(self, directory, settings):
+        self.directory = directory
+        self.settings = settings
+        self.filepath = os.path.join(directory, settings.SUMMARY_FILENAME)
+        self._indexes = None
+
+    def load(self):
+        try:
+            with open(self.filepath, 'r') as fh:
+                return json.load(fh)['indexes']
+        except (IOError, OSError, ValueError, KeyError):
+            return {}
+
+    def _summarise(self, filepath, signature):
+        django_json = DjangoJson(filepath, self.settings)
+        try:
+            header = django_json.get_header()
+            bloom = header.get('bloom')
+            version = header.get('version')
+            if version is None:
+                # indexes written before headers keep the version last
+                version = django_json.get_version()
+        except (DjangoIndexError, ValueError, KeyError, TypeError):
+            bloom, version = None, None
+        return {'signature': signature,
+                'bloom': bloom,
+                'version': list(version) if version else None}
+
+    def refresh(self):
+        """Bring the summary up to date with the index files in the directory,
+        re-reading only indexes that changed since it was written."""
+        indexes = self.load()
+        try:
+            filenames = os.listdir(self.directory)
+        except OSError:
+            filenames = []
+        current = {}
+        for filename in filenames:
+            if not self.index_finder.match(filename):
+                continue
+            filepath = os.path.join(self.directory, filename)
+            try:
+                signature = utils.file_signature(filepath)
+            except OSError:
+                continue
+            entry = indexes.get(filename)
+            if entry is None or entry['signature'] != signature:
+                entry = self._summarise(filepath, signature)
+            current[filename] = entry
+
+        if current != indexes:
+            try:
+                with utils.atomic_open(self.filepath) as fh:
+                    json.dump({'indexes': current}, fh)
+            except (IOError, OSError):
+                # read only directories still get an up to date summary for
+                # this process
+                pass
+        self._indexes = current
+        return current
+
+    @property
+    def indexes(self):
+        if self._indexes is None:
+            self.refresh()
+        return self._indexes
+
+    def might_contain(self, filename, name):
+        """False only when `name` is definitely not in the given index."""
+        entry = self.indexes.get(filename)
+        if entry is None or entry['bloom'] is None:
+            return True
+        return name in BloomFilter.from_dict(entry['bloom'])
+
+    def probable_versions(self, name):
+        versions = []
+        for filename, entry in sorted(self.indexes.items()):
+            if entry['version'] is None:
+                continue
+            if self.might_contain(filename, name):
+                versions.append(tuple(entry['version']))
+        return versions
@@ -1,5 +1,291 @@
-def main(*args, **kwargs):
-    print('pewpewpew lolol!')
+import time
+# taken before anything else is imported so tracing can report import time
+_clock = getattr(time, 'perf_counter', time.time)
+_started = _clock()
+
+import argparse  # NOQA
+import sys  # NOQA
+from indj import trace, utils  # NOQA
+from indj.exceptions import DjangoIndexError, LookupHandlerError  # NOQA
+from indj.handlers import (  # NOQA
+    CompatHandler, ExportHandler, OverlayHandler, SharedHandler,
+    StackedLookupHandler)
+from indj.discover import DiscoveryHandler  # NOQA
+from indj.pack import pack_filename  # NOQA
+from indj.resolve import ImportResolver  # NOQA
+from indj.watch import DjangoWatcher  # NOQA
+from indj.settings import Settings, DEFAULT_DJANGO_VERSION  # NOQA
+
+
+def get_version(args, settings):
+    if args.django_version:
+        return utils.version_from_string(args.django_version)
+    return settings.DJANGO_VERSION or DEFAULT_DJANGO_VERSION
+
+
+def add_version_argument(parser):
+    parser.add_argument(
+        '--django-version',
+        help='django version as a dashed string, e.g. 1-8-0-final-0')
+
+
+def add_overlay_argument(parser):
+    parser.add_argument(
+        '--overlay', action='append', default=[],
+        help='project index to search along with django, may be repeated')
+
+
+def compat(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj compat',
+        description='Show which django versions have an object, and where.')
+    parser.add_argument('name')
+    parser.add_argument('--path', help='only this import path')
+    parser.add_argument('--since', help='first version to consider')
+    parser.add_argument('--until', help='last version to consider')
+    args = parser.parse_args(argv)
+    django_compat = CompatHandler(settings).get_django_compat()
+    start = utils.version_from_string(args.since) if args.since else None
+    end = utils.version_from_string(args.until) if args.until else None
+    paths = django_compat.get_paths(args.name)
+    if args.path:
+        paths = dict((path, versions) for path, versions in paths.items()
+                     if path == args.path)
+    for path in sorted(paths):
+        versions = django_compat.get_versions(args.name, path, start, end)
+        if not versions:
+            continue
+        removed = django_compat.removed_in(args.name, path)
+        print('{path}: {versions} (since {since}{removed})'.format(
+            path=path,
+            versions=', '.join(utils.version_as_string(v) for v in versions),
+            since=utils.version_as_string(
+                django_compat.available_since(args.name, path)),
+            removed=', removed in {0}'.format(
+                utils.version_as_string(removed)) if removed else ''))
+
+
+def discover(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj discover',
+        description='Find django in virtualenvs, without importing it, and '
+                    'build any indexes that are missing.')
+    parser.add_argument('environments', nargs='+')
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help='only report what would be built')
+    args = parser.parse_args(argv)
+    handler = DiscoveryHandler(settings)
+    for install, status, filepath in handler.index(
+            args.environments, dry_run=args.dry_run):
+        print('{version} {directory}: {status}{filepath}'.format(
+            version=utils.version_as_string(install.version),
+            directory=install.directory,
+            status=status,
+            filepath=' {0}'.format(filepath) if filepath else ''))
+
+
+def export(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj export',
+        description='Write a django index as a sorted ctags file, or as a '
+                    'pack that can be bundled with indj.')
+    add_version_argument(parser)
+    parser.add_argument('output', nargs='?')
+    parser.add_argument('--format', choices=['tags', 'pack'], default='tags')
+    parser.add_argument(
+        '--force', action='store_true',
+        help='rewrite the tags file even if the index has not changed')
+    parser.add_argument(
+        '--src',
+        help='django source of the exported version to take tag locations '
+             'from, defaults to the installed django if it is that version')
+    args = parser.parse_args(argv)
+    version = get_version(args, settings)
+    handler = ExportHandler(version, settings)
+    if args.format == 'pack':
+        output = args.output or pack_filename(version)
+        print('Wrote {0}'.format(handler.export_pack(output)))
+        return
+    output = args.output or 'tags'
+    if handler.export_tags(output, overwrite=args.force, src=args.src):
+        print('Wrote {0}'.format(output))
+    else:
+        print('{0} is up to date'.format(output))
+
+
+def watch(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj watch',
+        description='Keep the index for a django source tree up to date.')
+    parser.add_argument('src', nargs='?', default=settings.DJANGO_DIRECTORY)
+    parser.add_argument('--output', default=settings.JSON_OUTPUT_DIRECTORY)
+    args = parser.parse_args(argv)
+    if not args.src:
+        parser.error('no django source directory given or installed')
+    settings.JSON_OUTPUT_DIRECTORY = args.output
+    watcher = DjangoWatcher(args.src, settings)
+    print('Watching {0}'.format(args.src))
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def overlay(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj overlay',
+        description='Index a project to layer over the django index.')
+    parser.add_argument('src', nargs='?', default='.')
+    parser.add_argument(
+        '--output',
+        help='defaults to {0} in the project'.format(settings.OVERLAY_FILENAME))
+    args = parser.parse_args(argv)
+    filepath = OverlayHandler(args.src, settings, args.output).save_overlay()
+    print('Wrote {0}'.format(filepath))
+
+
+def resolve(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj resolve',
+        description='Suggest imports for undefined names across a project.')
+    parser.add_argument('src', nargs='?', default='.')
+    add_version_argument(parser)
+    add_overlay_argument(parser)
+    parser.add_argument('--workers', type=int, default=settings.RESOLVE_WORKERS)
+    parser.add_argument(
+        '--shared', action='store_true', default=settings.SHARED_INDEX,
+        help='publish the index once for the workers to share')
+    args = parser.parse_args(argv)
+    settings.SHARED_INDEX = args.shared
+    resolver = ImportResolver(
+        args.src, get_version(args, settings), settings,
+        overlays=settings.OVERLAY_FILEPATHS + args.overlay,
+        workers=args.workers)
+    for filepath, statements, unresolved in resolver.resolve():
+        for statement in statements:
+            print('{0}: {1}'.format(filepath, statement))
+        for name in unresolved:
+            print('{0}: # unresolved {1}'.format(filepath, name))
+
+
+def share(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj share',
+        description='Publish an index for processes run with INDJ_SHARED=1 '
+                    'to map instead of loading their own copy.')
+    add_version_argument(parser)
+    parser.add_argument(
+        '--force', action='store_true',
+        help='republish even if the index has not changed')
+    parser.add_argument(
+        '--remove', action='store_true', help='remove a published index')
+    args = parser.parse_args(argv)
+    handler = SharedHandler(get_version(args, settings), settings)
+    if not args.remove:
+        print('Published {0}'.format(handler.publish(overwrite=args.force)))
+    elif handler.unpublish():
+        print('Removed {0}'.format(
+            utils.version_as_string(handler.version)))
+    else:
+        print('{0} is not published'.format(
+            utils.version_as_string(handler.version)))
+
+
+def stats(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj stats',
+        description='Summarise lookup timings recorded with --trace.')
+    parser.add_argument('--file', default=settings.STATS_FILEPATH)
+    args = parser.parse_args(argv)
+    rows = trace.summarise(trace.load_records(args.file))
+    if not rows:
+        print('No lookups recorded in {0}'.format(args.file))
+        return
+    print('{0:<20} {1:<8} {2:<14} {3:>6} {4:>9} {5:>9} {6:>9}'.format(
+        'version', 'format', 'phase', 'count', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for version, index_format, phase, count, p50, p95, p99 in rows:
+        print('{0:<20} {1:<8} {2:<14} {3:>6} {4:>9.3f} {5:>9.3f} {6:>9.3f}'.format(
+            version, index_format, phase, count,
+            p50 * 1000, p95 * 1000, p99 * 1000))
+
+
+def lookup(argv, settings):
+    parser = argparse.ArgumentParser(
+        prog='indj',
+        description='Look up the import paths of a django object.')
+    parser.add_argument(
+        'name', help='a name, or the end of an import path, e.g. models.Q')
+    add_version_argument(parser)
+    add_overlay_argument(parser)
+    parser.add_argument(
+        '-a', '--abbreviation', action='store_true',
+        help='treat the name as initials, e.g. HRR or goo404')
+    parser.add_argument(
+        '--trace', action='store_true', default=settings.TRACE,
+        help='print how long each phase of the lookup took and record it '
+             'for `indj stats`')
+    parser.add_argument(
+        '--trace-memory', action='store_true',
+        help='print the memory each phase allocated as well, this slows the '
+             'lookup down so it is not recorded for `indj stats`')
+    args = parser.parse_args(argv)
+    version = get_version(args, settings)
+    tracing = args.trace or args.trace_memory
+    if tracing:
+        trace.tracer.start(memory=args.trace_memory)
+        trace.tracer.add('imports', _clock() - _started)
+    handler = StackedLookupHandler(
+        version, settings, overlays=settings.OVERLAY_FILEPATHS + args.overlay)
+    try:
+        if args.abbreviation:
+            with trace.span('lookup_abbreviation'):
+                matches = handler.lookup_abbreviation(args.name)
+            lines = ['{0} {1}'.format(name, paths[0] if paths else '')
+                     for name, paths in matches]
+        elif '.' in args.name:
+            with trace.span('lookup_suffix'):
+                lines = handler.lookup_suffix(args.name)
+        else:
+            with trace.span('lookup'):
+                lines = handler.lookup(args.name)
+    finally:
+        if tracing:
+            trace.tracer.stop()
+            sys.stderr.write(trace.tracer.breakdown() + '\n')
+            if not args.trace_memory:
+                trace.tracer.record(
+                    settings.STATS_FILEPATH,
+                    settings.STATS_MAX_BYTES,
+                    version=utils.version_as_string(version),
+                    format=handler.index_format)
+    for line in lines:
+        print(line)
+
+
+COMMANDS = {
+    'compat': compat,
+    'discover': discover,
+    'export': export,
+    'overlay': overlay,
+    'resolve': resolve,
+    'share': share,
+    'stats': stats,
+    'watch': watch,
+}
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] in COMMANDS:
+        command, argv = COMMANDS[argv[0]], argv[1:]
+    else:
+        command = lookup
+    try:
+        return command(argv, Settings())
+    except (DjangoIndexError, LookupHandlerError) as e:
+        sys.exit('indj: {0}'.format(e))
 
 
 if __name__ == '__main__':
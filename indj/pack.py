@@ -0,0 +1,250 @@
+import json
+import mmap
+import pkgutil
+import struct
+import tempfile
+from . import utils
+from .abbrev import abbreviation_key
+from .exceptions import DjangoIndexError
+from .index import DjangoIndexWriter
+from .suffix import reverse_path
+
+try:
+    from importlib import resources
+except ImportError:
+    resources = None
+
+MAGIC = b'INDJPACK'
+FORMAT_VERSION = 2
+# magic, format version, header length, number of names
+PREAMBLE = struct.Struct('<8sIII')
+OFFSET = struct.Struct('<I')
+NAME_LENGTH = struct.Struct('<H')
+PATHS_LENGTH = struct.Struct('<I')
+
+
+class PackTable(object):
+    """Records sorted by key, each a key with newline separated values,
+    behind a table of offsets so a key is found by binary search. Indexing
+    gives the keys, so a table can be bisected like a sorted list."""
+
+    def __init__(self, data, start, count):
+        self.data = data
+        self.count = count
+        self._offsets = start
+        self._records = start + count * OFFSET.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self._record(i)[0].decode('utf-8')
+
+    def _record(self, i):
+        position = self._records + OFFSET.unpack_from(
+            self.data, self._offsets + i * OFFSET.size)[0]
+        key_length, = NAME_LENGTH.unpack_from(self.data, position)
+        position += NAME_LENGTH.size
+        key = bytes(self.data[position:position + key_length])
+        return key, position + key_length
+
+    def _values(self, position):
+        values_length, = PATHS_LENGTH.unpack_from(self.data, position)
+        position += PATHS_LENGTH.size
+        values = bytes(self.data[position:position + values_length])
+        return values.decode('utf-8').split('\n') if values else []
+
+    def get(self, key, default=None):
+        # keys are stored utf-8 encoded and sorted by code point, which
+        # orders the same way as their encoded bytes
+        wanted = key.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            found, position = self._record(middle)
+            if found < wanted:
+                low = middle + 1
+            elif found > wanted:
+                high = middle
+            else:
+                return self._values(position)
+        return default
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def items(self):
+        for i in range(self.count):
+            key, position = self._record(i)
+            yield key.decode('utf-8'), self._values(position)
+
+    @staticmethod
+    def write(fh, items):
+        """Write `(key, values)` pairs, already sorted by key, as records to
+        `fh`. Returns the offset of every record and their total size."""
+        offsets = []
+        size = 0
+        for key, values in items:
+            key = key.encode('utf-8')
+            values = '\n'.join(values).encode('utf-8')
+            offsets.append(size)
+            for chunk in [NAME_LENGTH.pack(len(key)), key,
+                          PATHS_LENGTH.pack(len(values)), values]:
+                fh.write(chunk)
+                size += len(chunk)
+        return offsets, size
+
+
+class DjangoPack(object):
+    """An index laid out so it can be queried straight from its bytes.
+
+    A small JSON header is followed by tables of the index data, its
+    abbreviations and its reversed import paths, each sorted by key so a
+    lookup is a binary search instead of a parse of the whole index. The
+    bytes can come from an mmapped file or from a resource inside a zip
+    without unpacking it.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        try:
+            magic, format_version, header_length, count = \
+                PREAMBLE.unpack_from(data, 0)
+        except struct.error:
+            raise DjangoIndexError('Index pack is truncated')
+        if magic != MAGIC:
+            raise DjangoIndexError('Not an index pack')
+        if format_version != FORMAT_VERSION:
+            raise DjangoIndexError(
+                'Unsupported index pack format {0}'.format(format_version))
+        start = PREAMBLE.size
+        self.header = json.loads(
+            bytes(data[start:start + header_length]).decode('utf-8'))
+        self.count = count
+        tables = []
+        start += header_length
+        for table_count, size in self.header['tables']:
+            tables.append(PackTable(data, start, table_count))
+            start += table_count * OFFSET.size + size
+        self._names, self._abbreviations, self._suffixes = tables
+
+    @classmethod
+    def from_filepath(cls, filepath):
+        with open(filepath, 'rb') as fh:
+            return cls(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @property
+    def version(self):
+        return tuple(self.header['version'])
+
+    def get(self, name, default=None):
+        return self._names.get(name, default)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def items(self):
+        return self._names.items()
+
+    def get_abbreviations(self):
+        return self._abbreviations
+
+    def get_suffixes(self):
+        return self._suffixes
+
+    @staticmethod
+    def write(fh, version, created, items, abbreviations=(), suffixes=()):
+        """Write `(name, paths)` pairs, `(abbreviation, names)` pairs and
+        reversed import paths, each already sorted, to the binary file handle
+        `fh`. Each is consumed in turn, so later ones can be generators filled
+        while the earlier are written."""
+        tables = [items, abbreviations, ((suffix, []) for suffix in suffixes)]
+        temporaries = []
+        try:
+            sections = []
+            for table in tables:
+                table_fh = tempfile.TemporaryFile()
+                temporaries.append(table_fh)
+                offsets, size = PackTable.write(table_fh, table)
+                sections.append((table_fh, offsets, size))
+            header = json.dumps(
+                {'version': version,
+                 'created': created,
+                 'tables': [[len(offsets), size]
+                            for _, offsets, size in sections]},
+                default=utils.json_serialize).encode('utf-8')
+            fh.write(PREAMBLE.pack(
+                MAGIC, FORMAT_VERSION, len(header), len(sections[0][1])))
+            fh.write(header)
+            for table_fh, offsets, _ in sections:
+                for offset in offsets:
+                    fh.write(OFFSET.pack(offset))
+                table_fh.seek(0)
+                while True:
+                    chunk = table_fh.read(65536)
+                    if not chunk:
+                        break
+                    fh.write(chunk)
+        finally:
+            for table_fh in temporaries:
+                table_fh.close()
+
+
+def pack_filename(version):
+    return 'django-{0}.pack'.format(utils.version_as_string(version))
+
+
+def write_pack(django_json, filepath, settings):
+    """Convert a JSON index to a pack, sorting it with the index writer's
+    spill and merge so the JSON is never fully loaded."""
+    header = django_json.get_header()
+    version = header.get('version') or list(django_json.get_version())
+    created = header.get('created') or django_json.data['created']
+    sorter = DjangoIndexWriter(None, None, settings)
+    abbreviations = DjangoIndexWriter(None, None, settings)
+    suffixes = DjangoIndexWriter(None, None, settings)
+
+    def items():
+        # the abbreviation and suffix sorters fill up as the names are
+        # written and are only merged once they are complete
+        for name, paths in sorter.grouped():
+            abbreviation = abbreviation_key(name)
+            if abbreviation is not None:
+                abbreviations.add(abbreviation, name)
+            for path in paths:
+                suffixes.add(reverse_path(path), '')
+            yield name, paths
+    try:
+        for name, paths in django_json.iter_index_data():
+            for path in paths:
+                sorter.add(name, path)
+        with utils.atomic_open(filepath, 'wb') as fh:
+            DjangoPack.write(
+                fh, version, created, items(), abbreviations.grouped(),
+                (suffix for suffix, _ in suffixes.grouped()))
+    finally:
+        sorter.close()
+        abbreviations.close()
+        suffixes.close()
+    return filepath
+
+
+def read_packaged(filename, package='indj'):
+    """Read a bundled file from the package's data directory whether it is
+    installed as files or inside a zip, None if it isn't bundled."""
+    try:
+        if resources is not None and hasattr(resources, 'files'):
+            return (resources.files(package).joinpath('data')
+                    .joinpath(filename).read_bytes())
+        return pkgutil.get_data(package, 'data/' + filename)
+    except (IOError, OSError):
+        return None
+
+
+def load_packaged(version):
+    data = read_packaged(pack_filename(version))
+    if data is None:
+        return None
+    return DjangoPack(data)
@@ -0,0 +1,158 @@
+import ast
+import multiprocessing
+from .exceptions import DjangoIndexError, LookupHandlerError
+from .handlers import SharedHandler, StackedLookupHandler
+from .index import ProjectSrc
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+BUILTIN_NAMES = set(dir(builtins)) | set([
+    '__file__', '__name__', '__doc__', '__package__', '__path__',
+    '__loader__', '__spec__', '__builtins__', '__cached__'])
+
+
+# nodes binding the plain string in their name, arg or rest, keywords and
+# import aliases look the same but bind nothing
+_BINDING_NODES = tuple(
+    getattr(ast, node_type)
+    for node_type in ['FunctionDef', 'AsyncFunctionDef', 'ClassDef', 'arg',
+                      'ExceptHandler', 'MatchAs', 'MatchStar', 'MatchMapping']
+    if hasattr(ast, node_type))
+
+
+def _bound_names(node):
+    if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+        return [node.id]
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return [(alias.asname or alias.name).split('.')[0]
+                for alias in node.names]
+    if isinstance(node, (ast.Global, getattr(ast, 'Nonlocal', ast.Global))):
+        return node.names
+    # python 2 gives *args and **kwargs as plain strings rather than arg nodes
+    if isinstance(node, ast.arguments):
+        return [value for value in [node.vararg, node.kwarg]
+                if isinstance(value, str)]
+    # function and class names, python 3 arguments, exception and match
+    # pattern names are all plain strings on the node
+    if isinstance(node, _BINDING_NODES):
+        return [value for value in [getattr(node, attribute, None)
+                                    for attribute in ['name', 'arg', 'rest']]
+                if isinstance(value, str)]
+    return []
+
+
+def find_undefined_names(source):
+    """Names that are read but never bound anywhere in `source`.
+
+    Scopes are not tracked, so a name bound anywhere in the file counts as
+    defined. Files with star imports or syntax errors report nothing.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, TypeError, ValueError):
+        return []
+    bound = set()
+    loaded = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(
+                alias.name == '*' for alias in node.names):
+            return []
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            loaded.add(node.id)
+        else:
+            bound.update(_bound_names(node))
+    return sorted(loaded - bound - BUILTIN_NAMES)
+
+
+def import_statements(resolved):
+    """Turn `{name: import_path}` into sorted import statements, one per
+    module."""
+    modules = {}
+    for name, path in resolved.items():
+        module, _, imported = path.rpartition('.')
+        if not module:
+            modules.setdefault(None, []).append(imported)
+            continue
+        if imported == name:
+            modules.setdefault(module, []).append(name)
+        else:
+            modules.setdefault(module, []).append(
+                '{0} as {1}'.format(imported, name))
+    statements = ['import {0}'.format(name)
+                  for name in sorted(modules.pop(None, []))]
+    for module in sorted(modules):
+        statements.append('from {0} import {1}'.format(
+            module, ', '.join(sorted(modules[module]))))
+    return statements
+
+
+# each worker process loads the index once, in _init_worker
+_handler = None
+
+
+def _init_worker(version, settings, overlays):
+    global _handler
+    _handler = StackedLookupHandler(version, settings, overlays)
+
+
+def _resolve_file(filepath):
+    try:
+        with open(filepath, 'r') as fh:
+            names = find_undefined_names(fh.read())
+    except (IOError, OSError, UnicodeDecodeError):
+        return filepath, [], []
+    found = _handler.lookup_many(names)
+    resolved = dict((name, paths[0]) for name, paths in found.items() if paths)
+    unresolved = [name for name in names if name not in resolved]
+    return filepath, import_statements(resolved), unresolved
+
+
+class ImportResolver(object):
+    """Suggests imports for the undefined names in every file of a project,
+    spreading files over a pool of worker processes."""
+
+    def __init__(self, src, version, settings, overlays=None, workers=None):
+        self.src = src
+        self.version = version
+        self.settings = settings
+        self.overlays = overlays
+        self.workers = workers or settings.RESOLVE_WORKERS
+
+    def get_filepaths(self):
+        return sorted(ProjectSrc(self.src, self.settings).get_filepaths())
+
+    def publish(self):
+        """Publish the django index once so the workers map the same copy
+        instead of each parsing the JSON."""
+        try:
+            return SharedHandler(self.version, self.settings).publish()
+        except (LookupHandlerError, DjangoIndexError):
+            # only the bundled pack, which workers read themselves, or
+            # nowhere to publish to, and the workers load their own copy
+            return None
+
+    def resolve(self):
+        """Yield `(filepath, import_statements, unresolved_names)` for every
+        file, in file order."""
+        filepaths = self.get_filepaths()
+        initargs = (self.version, self.settings, self.overlays)
+        if self.workers == 1:
+            _init_worker(*initargs)
+            for filepath in filepaths:
+                yield _resolve_file(filepath)
+            return
+        if self.settings.SHARED_INDEX:
+            self.publish()
+        pool = multiprocessing.Pool(
+            self.workers, initializer=_init_worker, initargs=initargs)
+        try:
+            for result in pool.imap(
+                    _resolve_file, filepaths,
+                    chunksize=self.settings.RESOLVE_CHUNK_SIZE):
+                yield result
+        finally:
+            pool.terminate()
+            pool.join()
@@ -1,18 +1,39 @@
+import getpass
 import os
+import tempfile
+from indj import utils
 
 DEFAULT_DJANGO_VERSION = (1, 8, 0, 'final', 0)
 
-try:
-    from django import VERSION as django_version
-    ENV_DJANGO_VERSION = django_version
-except ImportError:
-    ENV_DJANGO_VERSION = None
 
-try:
-    from django import __file__ as django_directory
-    ENV_DJANGO_DIRECTORY = os.path.dirname(django_directory)
-except ImportError:
-    ENV_DJANGO_DIRECTORY = None
+def find_django_directory():
+    # locating django without importing it keeps django's import time out
+    # of every lookup
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        import imp
+        try:
+            return imp.find_module('django')[1]
+        except ImportError:
+            return None
+    spec = find_spec('django')
+    if spec is None or not spec.origin:
+        return None
+    return os.path.dirname(spec.origin)
+
+
+def current_user():
+    getuid = getattr(os, 'getuid', None)
+    if getuid is not None:
+        return getuid()
+    return getpass.getuser()
+
+
+ENV_DJANGO_DIRECTORY = find_django_directory()
+ENV_DJANGO_VERSION = (
+    utils.read_django_version(ENV_DJANGO_DIRECTORY)
+    if ENV_DJANGO_DIRECTORY else None)
 
 
 class Settings(object):
@@ -25,6 +46,55 @@ class Settings(object):
         OUTPUT_DATA_DIRECTORY,
         PACKAGE_DATA_DIRECTORY,
     ]
+    JSON_OUTPUT_DIRECTORY = OUTPUT_DATA_DIRECTORY
+
+    # number of definitions held in memory by DjangoIndexWriter before a
+    # sorted run is spilled to a temporary file
+    INDEX_WRITER_BUFFER_SIZE = 50000
+
+    # false positive rate of the bloom filters written into index headers,
+    # and the file in each data directory summarising them
+    BLOOM_ERROR_RATE = 0.01
+    SUMMARY_FILENAME = 'summary.json'
+
+    # the version compatibility index, kept in JSON_OUTPUT_DIRECTORY
+    COMPAT_FILENAME = 'compat.json'
+
+    # seconds between scans when inotify is unavailable, and seconds the
+    # tree has to be quiet before a watched index is patched and saved
+    WATCH_POLL_INTERVAL = 1.0
+    WATCH_DEBOUNCE = 0.5
+
+    # project indexes layered over the django index at lookup time, e.g.
+    # INDJ_OVERLAYS=myproject/.indj-overlay.json. With OVERLAY_PRECEDENCE
+    # 'overlay' project paths come before django's, with 'base' after.
+    # OVERLAY_MERGE 'merge' combines the paths of every layer, 'shadow' only
+    # returns those of the first layer that has the name.
+    OVERLAY_FILEPATHS = [
+        path for path in os.environ.get('INDJ_OVERLAYS', '').split(os.pathsep)
+        if path]
+    OVERLAY_FILENAME = '.indj-overlay.json'
+    OVERLAY_PRECEDENCE = 'overlay'
+    OVERLAY_MERGE = 'merge'
+
+    # worker processes used by `indj resolve`, None for one per cpu, and the
+    # number of files handed to a worker at a time
+    RESOLVE_WORKERS = None
+    RESOLVE_CHUNK_SIZE = 16
+
+    # lookup tracing, also switched on by `indj --trace`
+    TRACE = bool(os.environ.get('INDJ_TRACE'))
+    STATS_FILEPATH = os.path.join(HOME_DIRECTORY, '.indj', 'stats.jsonl')
+    STATS_MAX_BYTES = 1024 * 1024
+
+    # indexes published as packs by `indj share` are mapped from here by
+    # every process of the same user, /dev/shm keeps them in memory where it
+    # exists. Lookups only use them with SHARED_INDEX, also switched on by
+    # INDJ_SHARED.
+    SHARED_DIRECTORY = os.path.join(
+        '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(),
+        'indj-{0}'.format(current_user()))
+    SHARED_INDEX = bool(os.environ.get('INDJ_SHARED'))
 
     DJANGO_VERSION = ENV_DJANGO_VERSION
     DJANGO_DIRECTORY = ENV_DJANGO_DIRECTORY
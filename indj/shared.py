@@ -0,0 +1,84 @@
+import os
+from stat import S_ISDIR
+from .exceptions import DjangoIndexError
+from .pack import DjangoPack, pack_filename, write_pack
+
+# packs mapped by this process, kept so every handler shares one mapping
+_attached = {}
+
+
+def shared_filepath(settings, version):
+    return os.path.join(settings.SHARED_DIRECTORY, pack_filename(version))
+
+
+def is_private(directory):
+    """Whether `directory` is a real directory only this user can write to,
+    so nobody else can have planted packs in it."""
+    try:
+        stat = os.lstat(directory)
+    except OSError:
+        return False
+    if not S_ISDIR(stat.st_mode) or stat.st_mode & 0o077:
+        return False
+    return not hasattr(os, 'getuid') or stat.st_uid == os.getuid()
+
+
+def attach(version, settings):
+    """The pack published for `version`, mapped read only so every process
+    attached to it shares the same pages, or None if it isn't published."""
+    filepath = shared_filepath(settings, version)
+    django_pack = _attached.get(filepath)
+    if django_pack is None:
+        if not is_private(settings.SHARED_DIRECTORY):
+            return None
+        try:
+            django_pack = DjangoPack.from_filepath(filepath)
+        except (IOError, OSError, ValueError, DjangoIndexError):
+            # packs in an older format are republished
+            return None
+        _attached[filepath] = django_pack
+    return django_pack
+
+
+def is_current(django_pack, django_json):
+    header = django_json.get_header()
+    created = header.get('created') or django_json.data['created']
+    return django_pack.header.get('created') == created
+
+
+def publish(django_json, settings, overwrite=False):
+    """Write a JSON index as a pack to the shared directory, unless the one
+    there was made from the same index. The pack is swapped in atomically so
+    processes already attached keep reading the old one."""
+    version = django_json.get_version()
+    filepath = shared_filepath(settings, version)
+    if not overwrite and os.path.exists(filepath):
+        django_pack = attach(version, settings)
+        if django_pack is not None and is_current(django_pack, django_json):
+            return filepath
+    directory = settings.SHARED_DIRECTORY
+    _attached.pop(filepath, None)
+    try:
+        if not os.path.exists(directory):
+            os.makedirs(directory, 0o700)
+        if not is_private(directory):
+            raise DjangoIndexError(
+                'Shared directory `{0}` is not private to this user'.format(
+                    directory))
+        return write_pack(django_json, filepath, settings)
+    except (IOError, OSError) as e:
+        raise DjangoIndexError(
+            'Could not publish to `{0}`: {1}'.format(directory, e))
+
+
+def unpublish(version, settings):
+    filepath = shared_filepath(settings, version)
+    _attached.pop(filepath, None)
+    if not os.path.exists(filepath):
+        return False
+    try:
+        os.remove(filepath)
+    except OSError as e:
+        raise DjangoIndexError(
+            'Could not remove `{0}`: {1}'.format(filepath, e))
+    return True
@@ -0,0 +1,47 @@
+import bisect
+
+
+def reverse_path(path):
+    """The components of a dotted path in reverse, e.g. django.db.models.Q
+    is Q.models.db.django."""
+    return '.'.join(reversed(path.split('.')))
+
+
+def build_suffixes(paths):
+    """Sort the reversed import paths so every path ending in a dotted suffix
+    sits in one run that can be found by bisection."""
+    return sorted(set(reverse_path(path) for path in paths))
+
+
+def find_suffix(suffixes, query):
+    """Import paths whose trailing components are exactly `query`, from a
+    sorted list of reversed paths or anything indexable like one."""
+    key = reverse_path(query)
+    start = bisect.bisect_left(suffixes, key)
+    matches = []
+    if start < len(suffixes) and suffixes[start] == key:
+        matches.append(query)
+    # '/' sorts straight after '.', bounding the paths that continue the key
+    start = bisect.bisect_left(suffixes, key + '.', start)
+    end = bisect.bisect_left(suffixes, key + '/', start)
+    matches.extend(reverse_path(suffixes[i]) for i in range(start, end))
+    return matches
+
+
+def _contains_in_order(path, components):
+    remaining = iter(path.split('.')[:-1])
+    return all(component in remaining for component in components)
+
+
+def rank_suffix_matches(query, exact, paths):
+    """Order the matches for `query`: exact suffix matches in the order the
+    index ranks them, then other paths of the name whose modules contain the
+    query's packages in order, e.g. django.forms.models.ModelForm for
+    forms.ModelForm."""
+    exact_matches = [path for path in paths if path in exact]
+    exact_matches.extend(
+        sorted(path for path in exact if path not in exact_matches))
+    components = query.split('.')[:-1]
+    return exact_matches + [
+        path for path in paths
+        if path not in exact and _contains_in_order(path, components)]
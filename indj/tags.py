@@ -0,0 +1,107 @@
+import os
+import re
+from . import utils
+from .index import DjangoIndexWriter
+
+
+class DjangoTags(object):
+    """Writes an index as a sorted ctags file so editors can binary search it
+    instead of calling indj for every symbol."""
+
+    definition_finder = re.compile(
+        r'^(?:class\s+(\w+)|def\s+(\w+)|(\w+)\s*=)', re.MULTILINE)
+    source_tag = '!_TAG_INDJ_SOURCE'
+
+    def __init__(self, filepath, settings, src=None):
+        self.filepath = filepath
+        self.settings = settings
+        # the django source the index was built from, without it tags point
+        # at relative paths
+        self.src = src
+        self._definitions = {}
+
+    def _get_module_filepath(self, module_import_path):
+        parts = module_import_path.split('.')[1:]
+        root = self.src
+        if root:
+            module_filepath = os.path.join(root, *parts) + '.py'
+            if os.path.exists(module_filepath):
+                return module_filepath
+            package_filepath = os.path.join(root, *(parts + ['__init__.py']))
+            if os.path.exists(package_filepath):
+                return package_filepath
+        return os.path.join('django', *parts) + '.py'
+
+    def _get_line_number(self, module_filepath, name):
+        if module_filepath not in self._definitions:
+            definitions = {}
+            if os.path.exists(module_filepath):
+                with open(module_filepath, 'r') as fh:
+                    contents = fh.read()
+                for match in self.definition_finder.finditer(contents):
+                    found = [group for group in match.groups() if group][0]
+                    if found not in definitions:
+                        definitions[found] = contents.count(
+                            '\n', 0, match.start()) + 1
+            self._definitions[module_filepath] = definitions
+        return self._definitions[module_filepath].get(name, 1)
+
+    def tag_line(self, name, import_path):
+        module_import_path = import_path.rpartition('.')[0]
+        module_filepath = self._get_module_filepath(module_import_path)
+        line_number = self._get_line_number(module_filepath, name)
+        return '{name}\t{filepath}\t{line};"\timport:{path}\n'.format(
+            name=name,
+            filepath=module_filepath,
+            line=line_number,
+            path=import_path)
+
+    def source_line(self, index_filepath):
+        return '{tag}\t{signature}\t/{filepath}/\n'.format(
+            tag=self.source_tag,
+            signature=utils.file_signature(index_filepath),
+            filepath=os.path.abspath(index_filepath))
+
+    def header_lines(self, index_filepath):
+        # pseudo tags have to be sorted along with everything else
+        return [
+            '!_TAG_FILE_FORMAT\t2\t/extended format/\n',
+            '!_TAG_FILE_SORTED\t1\t/0=unsorted, 1=sorted, 2=foldcase/\n',
+            self.source_line(index_filepath),
+            '!_TAG_PROGRAM_NAME\tindj\t//\n',
+        ]
+
+    def is_current(self, index_filepath):
+        if not os.path.exists(self.filepath):
+            return False
+        expected = self.source_line(index_filepath)
+        with open(self.filepath, 'r') as fh:
+            for line in fh:
+                if not line.startswith('!_TAG'):
+                    break
+                if line.startswith(self.source_tag + '\t'):
+                    return line == expected
+        return False
+
+    def write(self, django_json, overwrite=False):
+        """Write tags for `django_json` unless the tags file was already built
+        from the same index file. Returns True when the file was written."""
+        if not overwrite and self.is_current(django_json.filepath):
+            return False
+
+        # tags are sorted by name, then import path, through the same spill
+        # and merge used for writing indexes so large indexes never need to
+        # be held in memory
+        sorter = DjangoIndexWriter(None, None, self.settings)
+        try:
+            for name, paths in django_json.iter_index_data():
+                for path in sorted(paths):
+                    sorter.add(name, path)
+            with utils.atomic_open(self.filepath) as fh:
+                fh.writelines(self.header_lines(django_json.filepath))
+                for name, paths in sorter.grouped():
+                    for path in paths:
+                        fh.write(self.tag_line(name, path))
+        finally:
+            sorter.close()
+        return True
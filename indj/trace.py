@@ -0,0 +1,140 @@
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# perf_counter is python 3.3+
+_clock = getattr(time, 'perf_counter', time.time)
+
+
+def _traced_memory():
+    if tracemalloc is None or not tracemalloc.is_tracing():
+        return 0
+    return tracemalloc.get_traced_memory()[0]
+
+
+class Tracer(object):
+    """Collects timed spans for the phases of a lookup. Spans cost next to
+    nothing until tracing is started.
+
+    Allocations are only measured when tracing is started with `memory`,
+    since tracemalloc slows down everything it watches and would skew the
+    timings.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.spans = []
+
+    def start(self, memory=False):
+        self.enabled = True
+        self.memory = memory and tracemalloc is not None
+        self.spans = []
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        self.enabled = False
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def add(self, name, seconds, allocated=0):
+        if self.enabled:
+            self.spans.append((name, seconds, allocated))
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        memory = _traced_memory() if self.memory else 0
+        started = _clock()
+        try:
+            yield
+        finally:
+            seconds = _clock() - started
+            allocated = _traced_memory() - memory if self.memory else 0
+            self.add(name, seconds, allocated)
+
+    def breakdown(self):
+        if not self.memory:
+            lines = ['{0:<16} {1:>10}'.format('phase', 'ms')]
+            for name, seconds, _ in self.spans:
+                lines.append('{0:<16} {1:>10.3f}'.format(name, seconds * 1000))
+            return '\n'.join(lines)
+        lines = ['{0:<16} {1:>10} {2:>12}'.format('phase', 'ms', 'alloc KiB')]
+        for name, seconds, allocated in self.spans:
+            lines.append('{0:<16} {1:>10.3f} {2:>12.1f}'.format(
+                name, seconds * 1000, allocated / 1024.0))
+        return '\n'.join(lines)
+
+    def record(self, filepath, max_bytes, **extra):
+        """Append this trace to a rolling stats file, dropping the oldest half
+        of the file once it grows past `max_bytes`."""
+        record = dict(extra)
+        record['time'] = time.time()
+        record['spans'] = dict((name, seconds)
+                               for name, seconds, _ in self.spans)
+        directory = os.path.dirname(filepath)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(filepath, 'a') as fh:
+            fh.write(json.dumps(record))
+            fh.write('\n')
+        if os.path.getsize(filepath) > max_bytes:
+            with open(filepath, 'r') as fh:
+                lines = fh.readlines()
+            with open(filepath, 'w') as fh:
+                fh.writelines(lines[len(lines) // 2:])
+
+
+tracer = Tracer()
+span = tracer.span
+
+
+def load_records(filepath):
+    records = []
+    if not os.path.exists(filepath):
+        return records
+    with open(filepath, 'r') as fh:
+        for line in fh:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def percentile(values, percent):
+    """Nearest rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = int(math.ceil(percent / 100.0 * len(values))) - 1
+    return values[min(max(rank, 0), len(values) - 1)]
+
+
+def summarise(records):
+    """Group span durations by (version, format, phase) and return rows of
+    (version, format, phase, count, p50, p95, p99) in seconds."""
+    groups = {}
+    for record in records:
+        version = record.get('version') or '-'
+        index_format = record.get('format') or '-'
+        for phase, seconds in record.get('spans', {}).items():
+            key = (version, index_format, phase)
+            groups.setdefault(key, []).append(seconds)
+    rows = []
+    for key in sorted(groups):
+        values = sorted(groups[key])
+        rows.append(key + (len(values),
+                           percentile(values, 50),
+                           percentile(values, 95),
+                           percentile(values, 99)))
+    return rows
@@ -1,5 +1,12 @@
+import ast
 import re
 import os
+import tempfile
+from contextlib import contextmanager
+
+
+# os.replace is python 3.3+, os.rename overwrites atomically on posix
+_replace = getattr(os, 'replace', os.rename)
 
 
 def join_regexp(regexps):
@@ -9,10 +16,59 @@ def join_regexp(regexps):
     return re.compile('{joined_regexp}'.format(joined_regexp=joined_regexp))
 
 
+version_finder = re.compile(r'^VERSION\s*=\s*(.*)$', re.MULTILINE)
+release_finder = re.compile(
+    r'^(\d+)\.(\d+)(?:\.(\d+))?(?:(a|b|c|rc)(\d+))?(\.dev\d*)?')
+RELEASE_SUFFIXES = {'a': 'alpha', 'b': 'beta', 'c': 'rc', 'rc': 'rc'}
+
+
+def read_django_version(directory):
+    """The VERSION tuple of the django package in `directory`, read from the
+    source of its __init__.py rather than by importing it."""
+    with open(os.path.join(directory, '__init__.py'), 'r') as fh:
+        matches = version_finder.search(fh.read())
+    if matches is None:
+        return None
+    return tuple(ast.literal_eval(matches.group(1)))
+
+
+def version_from_release(release):
+    """Turn a released version string like 1.8.4 or 1.9rc1 into a django
+    VERSION tuple."""
+    matches = release_finder.match(release)
+    if matches is None:
+        return None
+    major, minor, micro, suffix, serial, dev = matches.groups()
+    version = (int(major), int(minor), int(micro or 0))
+    if dev:
+        return version + ('alpha', 0)
+    if suffix:
+        return version + (RELEASE_SUFFIXES[suffix], int(serial))
+    return version + ('final', 0)
+
+
 def version_as_string(version):
     return '-'.join("{0}".format(item) for item in version)
 
 
+def version_from_string(version_string):
+    return tuple(
+        int(item) if item.isdigit() else item
+        for item in version_string.split('-'))
+
+
+RELEASE_LEVELS = ['alpha', 'beta', 'rc', 'final']
+
+
+def version_sort_key(version):
+    """Sort key for django VERSION tuples, where release levels do not sort
+    alphabetically."""
+    return tuple(
+        (1, RELEASE_LEVELS.index(item)) if item in RELEASE_LEVELS else
+        (0, item) if isinstance(item, int) else (2, item)
+        for item in version)
+
+
 def data_filepath_from_version(data_directory, version):
     version_string = version_as_string(version)
     data_filename = os.path.join(
@@ -21,9 +77,58 @@ def data_filepath_from_version(data_directory, version):
     return data_filename
 
 
+def _read_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# os.umask can only be read by setting it, which isn't safe once other
+# threads may be creating files, so it is read while importing
+_umask = _read_umask()
+
+
+def current_umask():
+    """The process umask, from /proc where linux gives it without changing
+    it, else as it was when indj was imported."""
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (IOError, OSError, ValueError):
+        pass
+    return _umask
+
+
+def file_signature(filepath):
+    stat = os.stat(filepath)
+    # whole seconds would miss an index rewritten within the same second
+    mtime = getattr(stat, 'st_mtime_ns', None) or int(stat.st_mtime * 1e9)
+    return '{0}-{1}'.format(mtime, stat.st_size)
+
+
 def json_serialize(obj):
     if hasattr(obj, 'isoformat'):
         return obj.isoformat()
     else:
         raise TypeError(
             'Object of type %s with value of %s is not JSON serializable' % (type(obj), repr(obj)))
+
+
+@contextmanager
+def atomic_open(filepath, mode='w'):
+    """Write to a temporary file next to `filepath` and move it into place once
+    the block completes, so readers never see a partially written file."""
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, temp_filepath = tempfile.mkstemp(
+        dir=directory, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as fh:
+            yield fh
+        # mkstemp makes the file private, give it the mode open() would have
+        os.chmod(temp_filepath, 0o666 & ~current_umask())
+        _replace(temp_filepath, filepath)
+    except BaseException:
+        os.remove(temp_filepath)
+        raise
@@ -0,0 +1,211 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import time
+from datetime import datetime
+from .index import DjangoIndex, DjangoSrc
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+
+class PollingMonitor(object):
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    def watch(self, directories):
+        pass
+
+    def wait(self, timeout=None):
+        # every wake up is a possible change, the watcher compares mtimes
+        if timeout is None:
+            timeout = self.settings.WATCH_POLL_INTERVAL
+        time.sleep(min(timeout, self.settings.WATCH_POLL_INTERVAL))
+        return True
+
+    def settle(self, period):
+        # a single scan already sees the whole burst of changes
+        pass
+
+    def close(self):
+        pass
+
+
+class InotifyMonitor(object):
+
+    def __init__(self, settings):
+        self.settings = settings
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+
+    def watch(self, directories):
+        # adding a watch to an already watched directory is a no-op
+        for directory in directories:
+            self._add_watch(self.fd, directory.encode('utf-8'), WATCH_MASK)
+
+    def wait(self, timeout=None):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        os.read(self.fd, 65536)
+        return True
+
+    def settle(self, period):
+        # keep swallowing events until the tree has been quiet for `period`
+        # so a burst of saves causes a single update
+        while self.wait(period):
+            pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def get_monitor(settings):
+    try:
+        return InotifyMonitor(settings)
+    except (AttributeError, OSError, TypeError):
+        return PollingMonitor(settings)
+
+
+class DjangoWatcher(object):
+
+    def __init__(self, src, settings, monitor=None):
+        self.src = src
+        self.settings = settings
+        self.django_src = DjangoSrc(src, settings)
+        self.monitor = monitor or get_monitor(settings)
+        self.index = None
+        self._mtimes = {}
+        self._definitions = {}
+        # how many files give each (name, path), imports repeat the path of
+        # the module they import from
+        self._counts = {}
+        # the (name, path) pairs whose module defines the name, found only
+        # by the file of that module
+        self._defining = {}
+        self._defined = set()
+
+    def get_directories(self):
+        return [root for root, _, _ in os.walk(self.src)]
+
+    def snapshot(self):
+        mtimes = {}
+        for path in self.django_src.get_filepaths():
+            try:
+                mtimes[path] = os.stat(path).st_mtime
+            except OSError:
+                continue
+        return mtimes
+
+    def changes(self):
+        mtimes = self.snapshot()
+        modified = [path for path, mtime in mtimes.items()
+                    if self._mtimes.get(path) != mtime]
+        removed = [path for path in self._mtimes if path not in mtimes]
+        return mtimes, modified, removed
+
+    def _extract(self, path):
+        try:
+            definitions = self.django_src._get_definitions_from_file(path)
+        except (IOError, OSError):
+            definitions = []
+        self._definitions[path] = definitions
+        for definition in definitions:
+            self._counts[definition] = self._counts.get(definition, 0) + 1
+        self._defining[path] = set(
+            definition for definition in definitions
+            if self.django_src.is_definition(*definition))
+        self._defined.update(self._defining[path])
+        return definitions
+
+    def _forget(self, path):
+        """Drop the definitions extracted from `path`, returning those no
+        other file still gives."""
+        gone = []
+        self._defined.difference_update(self._defining.pop(path, ()))
+        for definition in self._definitions.pop(path, []):
+            count = self._counts.get(definition, 0) - 1
+            if count > 0:
+                self._counts[definition] = count
+            else:
+                self._counts.pop(definition, None)
+                gone.append(definition)
+        return gone
+
+    def rank(self, name):
+        paths = self.index.data[name]
+        if len(paths) > 1:
+            self.index.data[name] = self.django_src.rank_paths(
+                name, paths,
+                set(path for path in paths if (name, path) in self._defined))
+
+    def build(self):
+        self._mtimes = self.snapshot()
+        self._definitions = {}
+        self._counts = {}
+        self._defining = {}
+        self._defined = set()
+        self.index = DjangoIndex(data={},
+                                 version=self.django_src.get_version(),
+                                 created=datetime.now(),
+                                 settings=self.settings)
+        for path in sorted(self._mtimes):
+            self.index.add_definitions(self._extract(path))
+        for name in self.index.data:
+            self.rank(name)
+        self.monitor.watch(self.get_directories())
+        return self.index
+
+    def update(self):
+        """Re-extract files changed since the last build or update and patch
+        the index in place. Returns the paths that changed."""
+        mtimes, modified, removed = self.changes()
+        names = set()
+        for path in modified + removed:
+            definitions = self._forget(path)
+            names.update(name for name, _ in definitions)
+            self.index.remove_definitions(definitions)
+        for path in removed:
+            self.django_src.modules.pop(
+                self.django_src._get_module_import_path(path), None)
+        for path in modified:
+            definitions = self._extract(path)
+            names.update(name for name, _ in definitions)
+            self.index.add_definitions(definitions)
+        for name in names:
+            if name in self.index.data:
+                self.rank(name)
+        self._mtimes = mtimes
+        if modified or removed:
+            self.index.created = datetime.now()
+        return modified + removed
+
+    def run(self, iterations=None):
+        if self.index is None:
+            self.build()
+            self.index.save(overwrite=True)
+        count = 0
+        try:
+            while iterations is None or count < iterations:
+                count += 1
+                if not self.monitor.wait(self.settings.WATCH_POLL_INTERVAL):
+                    continue
+                self.monitor.settle(self.settings.WATCH_DEBOUNCE)
+                self.monitor.watch(self.get_directories())
+                if self.update():
+                    self.index.save(overwrite=True)
+        finally:
+            self.monitor.close()
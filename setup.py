@@ -12,7 +12,9 @@ setup(
     license="MIT",
     author="Nic West",
     packages=['indj'],
-    package_data={'indj': ['data/*.json']},
+    package_data={'indj': ['data/*.json', 'data/*.pack']},
+    # bundled packs are read in place with importlib.resources
+    zip_safe=True,
     install_requires=['jedi==0.8.1'],
     long_description=long_description,
     classifiers=[
@@ -1,11 +1,20 @@
 import os
+import re
+import sys
+import shutil
 import pytest
 import json
 from indj.settings import Settings
 from datetime import datetime
-from indj.index import DjangoIndex, DjangoSrc, DjangoJson
+from indj.index import (
+    DjangoIndex, DjangoIndexWriter, DjangoSrc, DjangoJson, DjangoSummary)
+from indj.tags import DjangoTags
+from indj.watch import DjangoWatcher, PollingMonitor
 from indj.handlers import LookupHandler, CreationHandler
 
+# the asyncio api needs async/await
+collect_ignore = ['test_aio.py'] if sys.version_info < (3, 5) else []
+
 try:
     import django  # NOQA
     has_django = True
@@ -139,3 +148,68 @@ def data_files(tmpdir, index_data):
         json.dump(index_data, fh)
 
     return (output, package, )
+
+
+@pytest.fixture
+def writer(tmpdir, index_settings):
+    index_settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+    index_settings.INDEX_WRITER_BUFFER_SIZE = 2
+    version = (1, 2, 3, 'final', 4)
+    created = datetime(2015, 4, 18, 12, 30, 45)
+    return DjangoIndexWriter(version, created, index_settings)
+
+
+@pytest.fixture
+def tags(tmpdir, index_settings):
+    src = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        'mockdjango')
+    filepath = os.path.join(str(tmpdir), 'tags')
+    return DjangoTags(filepath, index_settings, src)
+
+
+@pytest.fixture
+def watcher(tmpdir, index_settings, monkeypatch):
+    mockdjango = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        'mockdjango')
+    src = os.path.join(str(tmpdir), 'django')
+    shutil.copytree(mockdjango, src)
+    output = os.path.join(str(tmpdir), 'output')
+    os.mkdir(output)
+    index_settings.JSON_OUTPUT_DIRECTORY = output
+    index_settings.WATCH_POLL_INTERVAL = 0
+    index_settings.WATCH_DEBOUNCE = 0
+    watcher = DjangoWatcher(src, index_settings, PollingMonitor(index_settings))
+
+    def definitions(path):
+        module_import_path = watcher.django_src._get_module_import_path(path)
+        with open(path) as fh:
+            names = re.findall(r'^(?:class|def)\s+(\w+)', fh.read(), re.MULTILINE)
+        return [(name, '{0}.{1}'.format(module_import_path, name))
+                for name in names]
+
+    monkeypatch.setattr(
+        watcher.django_src, '_get_definitions_from_file', definitions)
+    return watcher
+
+
+@pytest.fixture
+def summary(tmpdir, index_settings):
+    index_settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+    return DjangoSummary(str(tmpdir), index_settings)
+
+
+@pytest.fixture
+def overlay_file(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'overlay.json')
+    with open(filepath, 'w') as fh:
+        json.dump({
+            'data': {
+                'Thing': ['myapp.models.Thing'],
+                'Widget': ['myapp.widgets.Widget'],
+            },
+            'version': (1, 2, 3, 'final', 4),
+            'created': '2015-04-18T12:30:45'
+        }, fh)
+    return filepath
@@ -0,0 +1,45 @@
+from indj.abbrev import abbreviate, build_abbreviations, rank_abbreviation_matches
+
+
+def test_abbreviate_camel_humps():
+    assert abbreviate('HttpResponseRedirect') == 'HRR'
+    assert abbreviate('HTTPResponse') == 'HR'
+    assert abbreviate('URLValidator') == 'UV'
+
+
+def test_abbreviate_underscore_segments_keeping_numbers():
+    assert abbreviate('get_object_or_404') == 'goo404'
+    assert abbreviate('_private_thing') == 'pt'
+    assert abbreviate('ipv6_address') == 'i6a'
+
+
+def test_build_abbreviations_maps_lower_cased_initials():
+    abbreviations = build_abbreviations([
+        'HttpResponseRedirect', 'HttpResponseRedirectBase', 'get_object_or_404',
+        'HostRoutingRule'])
+    assert abbreviations == {
+        'hrr': ['HostRoutingRule', 'HttpResponseRedirect'],
+        'hrrb': ['HttpResponseRedirectBase'],
+        'goo404': ['get_object_or_404']}
+
+
+def test_build_abbreviations_skips_names_that_are_their_own_initials():
+    assert build_abbreviations(['F', 'Q', 'render']) == {'r': ['render']}
+
+
+def test_rank_abbreviation_matches_prefers_matching_case():
+    names = ['has_request_route', 'HttpResponseRedirect']
+    assert rank_abbreviation_matches('HRR', names, {}) == [
+        'HttpResponseRedirect', 'has_request_route']
+    assert rank_abbreviation_matches('hrr', names, {}) == [
+        'has_request_route', 'HttpResponseRedirect']
+
+
+def test_rank_abbreviation_matches_prefers_more_paths_then_shorter_names():
+    data = {
+        'HostRoutingRule': ['a.HostRoutingRule'],
+        'HttpResponseRedirect': ['a.HttpResponseRedirect', 'b.HttpResponseRedirect'],
+        'HeavyRoundRobin': ['a.HeavyRoundRobin'],
+    }
+    assert rank_abbreviation_matches('HRR', list(data), data) == [
+        'HttpResponseRedirect', 'HeavyRoundRobin', 'HostRoutingRule']
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import pytest
+from indj.aio import AsyncLookup
+from indj.exceptions import LookupHandlerError
+
+
+@pytest.fixture
+def async_lookup(data_files, index_settings):
+    output, package = data_files
+    index_settings.DATA_DIRECTORIES = [output, package]
+    return AsyncLookup(index_settings)
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_lookup_returns_import_paths(async_lookup):
+    async def lookups():
+        return (await async_lookup.lookup('Thing', (1, 2, 3, 'final', 4)),
+                await async_lookup.lookup('Nope', (1, 2, 3, 'final', 4)))
+    assert run(lookups()) == (['foobars.Thing', 'dohickies.Thing'], [])
+
+
+def test_lookup_many(async_lookup):
+    result = run(async_lookup.lookup_many(['PewPew', 'Nope'], (3, 2, 1, 'alpha', 0)))
+    assert result == {'PewPew': ['foobars.PewPew'], 'Nope': []}
+
+
+def test_concurrent_lookups_share_one_load(async_lookup, monkeypatch):
+    loads = []
+    release = threading.Event()
+    get_handler = async_lookup.get_handler
+
+    def counting_handler(version):
+        handler = get_handler(version)
+        get_index_data = handler.get_index_data
+
+        def slow_get_index_data():
+            loads.append(version)
+            release.wait(5)
+            return get_index_data()
+        handler.get_index_data = slow_get_index_data
+        return handler
+    monkeypatch.setattr(async_lookup, 'get_handler', counting_handler)
+
+    async def lookups():
+        tasks = [asyncio.ensure_future(
+            async_lookup.lookup('Thing', (1, 2, 3, 'final', 4)))
+            for _ in range(10)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*tasks)
+    results = run(lookups())
+    assert loads == [(1, 2, 3, 'final', 4)]
+    assert all(result == ['foobars.Thing', 'dohickies.Thing'] for result in results)
+
+
+def test_loaded_index_is_reused(async_lookup, monkeypatch):
+    run(async_lookup.preload([(1, 2, 3, 'final', 4)]))
+    monkeypatch.setattr(
+        async_lookup, 'get_handler',
+        lambda version: pytest.fail('index should not load again'))
+    assert run(async_lookup.lookup('PewPew', [1, 2, 3, 'final', 4])) == ['foobars.PewPew']
+
+
+def test_forget_drops_loaded_index(async_lookup):
+    run(async_lookup.preload([(1, 2, 3, 'final', 4)]))
+    async_lookup.forget((1, 2, 3, 'final', 4))
+    assert async_lookup._loaded == {}
+
+
+def test_failed_load_is_not_cached(async_lookup):
+    with pytest.raises(LookupHandlerError):
+        run(async_lookup.lookup('Thing', (9, 9, 9, 'zeta', 9)))
+    assert async_lookup._loading == {}
+    assert async_lookup._loaded == {}
+
+
+def test_cancelled_request_does_not_cancel_shared_load(async_lookup):
+    async def lookups():
+        first = asyncio.ensure_future(
+            async_lookup.lookup('Thing', (1, 2, 3, 'final', 4)))
+        second = asyncio.ensure_future(
+            async_lookup.lookup('Thing', (1, 2, 3, 'final', 4)))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+    assert run(lookups()) == ['foobars.Thing', 'dohickies.Thing']
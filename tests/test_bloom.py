@@ -0,0 +1,42 @@
+from indj.bloom import BloomFilter
+
+
+def test_for_capacity_sizes_filter():
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    assert 9000 < bloom.size < 10000
+    assert bloom.hashes == 7
+    assert len(bloom.bits) == (bloom.size + 7) // 8
+
+
+def test_for_capacity_handles_empty_filters():
+    bloom = BloomFilter.for_capacity(0, 0.01)
+    assert bloom.size > 0
+    assert 'Thing' not in bloom
+
+
+def test_contains_added_names():
+    bloom = BloomFilter.for_capacity(10, 0.01)
+    bloom.add('Thing')
+    bloom.add('PewPew')
+    assert 'Thing' in bloom
+    assert 'PewPew' in bloom
+    assert 'Nope' not in bloom
+
+
+def test_false_positive_rate_is_close_to_error_rate():
+    bloom = BloomFilter.for_capacity(1000, 0.01)
+    for i in range(1000):
+        bloom.add('name{0}'.format(i))
+    false_positives = sum(
+        1 for i in range(10000) if 'other{0}'.format(i) in bloom)
+    assert false_positives < 300
+
+
+def test_to_dict_round_trips():
+    bloom = BloomFilter.for_capacity(10, 0.01)
+    bloom.add('Thing')
+    loaded = BloomFilter.from_dict(bloom.to_dict())
+    assert loaded.size == bloom.size
+    assert loaded.hashes == bloom.hashes
+    assert loaded.bits == bloom.bits
+    assert 'Thing' in loaded
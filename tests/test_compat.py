@@ -0,0 +1,126 @@
+import json
+import os
+import pytest
+from indj.compat import DjangoCompat
+
+
+def write_index(directory, version, data):
+    filepath = os.path.join(
+        directory, 'django-{0}.json'.format('-'.join(str(v) for v in version)))
+    with open(filepath, 'w') as fh:
+        json.dump({'version': version,
+                   'created': '2015-04-18T12:30:45',
+                   'data': data}, fh)
+    return filepath
+
+
+@pytest.fixture
+def compat(tmpdir, index_settings):
+    output = str(tmpdir.mkdir('output'))
+    package = str(tmpdir.mkdir('package'))
+    index_settings.DATA_DIRECTORIES = [output, package]
+    write_index(package, [1, 6, 0, 'final', 0], {
+        'HttpResponse': ['django.http.HttpResponse'],
+        'simplejson': ['django.utils.simplejson']})
+    write_index(package, [1, 7, 0, 'final', 0], {
+        'HttpResponse': ['django.http.HttpResponse'],
+        'JsonResponse': ['django.http.JsonResponse']})
+    write_index(package, [1, 8, 0, 'rc', 1], {
+        'HttpResponse': ['django.http.HttpResponse'],
+        'JsonResponse': ['django.http.JsonResponse',
+                         'django.http.response.JsonResponse']})
+    write_index(output, [1, 8, 0, 'final', 0], {
+        'HttpResponse': ['django.http.HttpResponse'],
+        'JsonResponse': ['django.http.JsonResponse',
+                         'django.http.response.JsonResponse']})
+    return DjangoCompat(os.path.join(output, 'compat.json'), index_settings)
+
+
+class TestDjangoCompat:
+
+    def test_build_orders_versions(self, compat):
+        compat.build()
+        assert compat.versions == [
+            (1, 6, 0, 'final', 0),
+            (1, 7, 0, 'final', 0),
+            (1, 8, 0, 'rc', 1),
+            (1, 8, 0, 'final', 0)]
+
+    def test_build_stores_bitsets(self, compat):
+        compat.build()
+        assert compat.data['HttpResponse'] == {'django.http.HttpResponse': 15}
+        assert compat.data['JsonResponse'] == {
+            'django.http.JsonResponse': 14,
+            'django.http.response.JsonResponse': 12}
+        assert compat.data['simplejson'] == {'django.utils.simplejson': 1}
+
+    def test_get_index_filepaths_prefers_first_directory(self, compat, tmpdir):
+        package = os.path.join(str(tmpdir), 'package')
+        write_index(package, [1, 8, 0, 'final', 0], {'Nope': ['django.Nope']})
+        compat.build()
+        assert 'Nope' not in compat.data
+
+    def test_get_versions(self, compat):
+        compat.build()
+        assert compat.get_versions('JsonResponse') == [
+            (1, 7, 0, 'final', 0), (1, 8, 0, 'rc', 1), (1, 8, 0, 'final', 0)]
+        assert compat.get_versions(
+            'JsonResponse', 'django.http.response.JsonResponse') == [
+            (1, 8, 0, 'rc', 1), (1, 8, 0, 'final', 0)]
+        assert compat.get_versions('Nope') == []
+
+    def test_get_versions_in_range(self, compat):
+        compat.build()
+        assert compat.get_versions(
+            'HttpResponse', start=(1, 7, 0, 'final', 0), end=(1, 8, 0, 'rc', 1)) == [
+            (1, 7, 0, 'final', 0), (1, 8, 0, 'rc', 1)]
+
+    def test_get_versions_with_partial_bounds_covers_release_series(self, compat):
+        compat.build()
+        assert compat.get_versions('HttpResponse', start=(1, 7), end=(1, 8)) == [
+            (1, 7, 0, 'final', 0), (1, 8, 0, 'rc', 1), (1, 8, 0, 'final', 0)]
+        assert compat.get_versions('HttpResponse', end=(1, 7)) == [
+            (1, 6, 0, 'final', 0), (1, 7, 0, 'final', 0)]
+        assert compat.get_versions('HttpResponse', start=(1, 8)) == [
+            (1, 8, 0, 'rc', 1), (1, 8, 0, 'final', 0)]
+
+    def test_get_paths(self, compat):
+        compat.build()
+        assert compat.get_paths('simplejson') == {
+            'django.utils.simplejson': [(1, 6, 0, 'final', 0)]}
+
+    def test_available_since(self, compat):
+        compat.build()
+        assert compat.available_since('JsonResponse') == (1, 7, 0, 'final', 0)
+        assert compat.available_since('Nope') is None
+
+    def test_removed_in(self, compat):
+        compat.build()
+        assert compat.removed_in('simplejson') == (1, 7, 0, 'final', 0)
+        assert compat.removed_in('JsonResponse') is None
+        assert compat.removed_in('Nope') is None
+
+    def test_save_and_load(self, compat):
+        compat.build().save()
+        loaded = DjangoCompat(compat.filepath, compat.settings).load()
+        assert loaded.versions == compat.versions
+        assert loaded.data == compat.data
+        assert loaded.is_current
+
+    def test_load_or_build_rebuilds_when_indexes_change(self, compat, tmpdir):
+        compat.load_or_build()
+        assert os.path.exists(compat.filepath)
+        package = os.path.join(str(tmpdir), 'package')
+        write_index(package, [1, 9, 0, 'final', 0], {'Other': ['django.Other']})
+        reloaded = DjangoCompat(compat.filepath, compat.settings)
+        assert not reloaded.load().is_current
+        reloaded.load_or_build()
+        assert reloaded.versions[-1] == (1, 9, 0, 'final', 0)
+        assert reloaded.removed_in('JsonResponse') == (1, 9, 0, 'final', 0)
+
+    def test_load_or_build_uses_saved_index(self, compat, monkeypatch):
+        compat.load_or_build()
+        reloaded = DjangoCompat(compat.filepath, compat.settings)
+        monkeypatch.setattr(
+            reloaded, 'build', lambda: pytest.fail('should not rebuild'))
+        assert reloaded.load_or_build().versions == compat.versions
@@ -0,0 +1,110 @@
+import os
+import re
+from indj import discover
+from indj.index import DjangoSrc
+from indj.discover import DiscoveryHandler, find_install, find_site_packages
+
+
+def make_env(tmpdir, name, version, source='class Thing(object):\n    pass\n',
+             metadata=None):
+    site_packages = tmpdir.join(name, 'lib', 'python3.4', 'site-packages')
+    django = site_packages.join('django')
+    django.ensure(dir=True)
+    if version is None:
+        django.join('__init__.py').write('from .utils import VERSION\n')
+    else:
+        django.join('__init__.py').write(
+            'VERSION = {0!r}\n'.format(version))
+    django.join('things.py').write(source)
+    if metadata is not None:
+        site_packages.join('Django-{0}.dist-info'.format(metadata)).ensure(
+            dir=True).join('METADATA').write(
+                'Metadata-Version: 2.0\nName: Django\nVersion: {0}\n\n'
+                'Version: 0.0\n'.format(metadata))
+    return str(tmpdir.join(name))
+
+
+def test_find_site_packages_finds_virtualenv_layouts(tmpdir):
+    tmpdir.join('unix', 'lib', 'python2.7', 'site-packages').ensure(dir=True)
+    tmpdir.join('windows', 'Lib', 'site-packages').ensure(dir=True)
+    tmpdir.join('bare', 'django').ensure(dir=True)
+    assert find_site_packages(str(tmpdir.join('unix'))) == [
+        str(tmpdir.join('unix', 'lib', 'python2.7', 'site-packages'))]
+    assert find_site_packages(str(tmpdir.join('windows'))) == [
+        str(tmpdir.join('windows', 'Lib', 'site-packages'))]
+    assert find_site_packages(str(tmpdir.join('bare'))) == [
+        str(tmpdir.join('bare'))]
+    assert find_site_packages(str(tmpdir.join('missing'))) == []
+
+
+def test_find_install_reads_version_from_source(tmpdir, index_settings):
+    env = make_env(tmpdir, 'env', (1, 8, 4, 'final', 0))
+    install = find_install(find_site_packages(env)[0], index_settings)
+    assert install.version == (1, 8, 4, 'final', 0)
+    assert install.directory.endswith(os.path.join('site-packages', 'django'))
+
+
+def test_find_install_falls_back_to_metadata(tmpdir, index_settings):
+    env = make_env(tmpdir, 'env', None, metadata='1.9rc1')
+    install = find_install(find_site_packages(env)[0], index_settings)
+    assert install.version == (1, 9, 0, 'rc', 1)
+
+
+def test_find_install_skips_site_packages_without_django(tmpdir,
+                                                         index_settings):
+    assert find_install(str(tmpdir), index_settings) is None
+
+
+def test_dedupe_only_hashes_repeated_versions(tmpdir, index_settings):
+    handler = DiscoveryHandler(index_settings)
+    installs = handler.find_installs([
+        make_env(tmpdir, 'a', (1, 8, 0, 'final', 0)),
+        make_env(tmpdir, 'b', (1, 7, 0, 'final', 0)),
+        make_env(tmpdir, 'c', (1, 8, 0, 'final', 0)),
+        make_env(tmpdir, 'd', (1, 8, 0, 'final', 0), source='x = 1\n'),
+    ])
+    unique, duplicates, conflicts = handler.dedupe(installs)
+    assert [i.version for i in unique] == [
+        (1, 8, 0, 'final', 0), (1, 7, 0, 'final', 0)]
+    assert [i.site_packages for i in duplicates] == [installs[2].site_packages]
+    assert [i.site_packages for i in conflicts] == [installs[3].site_packages]
+    assert installs[1]._digest is None
+
+
+def test_index_builds_missing_and_reuses_existing(tmpdir, index_settings,
+                                                  monkeypatch):
+    output = str(tmpdir.join('output'))
+    index_settings.JSON_OUTPUT_DIRECTORY = output
+    index_settings.DATA_DIRECTORIES = [output]
+
+    def definitions(self, path):
+        module_import_path = self._get_module_import_path(path)
+        with open(path) as fh:
+            names = re.findall(r'^class\s+(\w+)', fh.read(), re.MULTILINE)
+        return [(name, '{0}.{1}'.format(module_import_path, name))
+                for name in names]
+
+    monkeypatch.setattr(DjangoSrc, '_get_definitions_from_file', definitions)
+    environments = [
+        make_env(tmpdir, 'a', (1, 8, 0, 'final', 0)),
+        make_env(tmpdir, 'b', (1, 8, 0, 'final', 0)),
+    ]
+    handler = DiscoveryHandler(index_settings)
+    assert [status for _, status, _ in handler.index(
+        environments, dry_run=True)] == ['missing', 'duplicate']
+    assert not os.path.exists(output)
+
+    results = list(handler.index(environments))
+    assert [status for _, status, _ in results] == ['built', 'duplicate']
+    assert os.path.exists(results[0][2])
+
+    built = []
+    monkeypatch.setattr(handler, 'build', built.append)
+    assert [status for _, status, _ in handler.index(environments)] == [
+        'reused', 'duplicate']
+    assert built == []
+
+
+def test_site_packages_patterns_cover_lib64():
+    assert os.path.join('lib64', 'python*', 'site-packages') in \
+        discover.SITE_PACKAGES_PATTERNS
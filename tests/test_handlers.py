@@ -5,6 +5,9 @@ from conftest import needs_django, no_django
 from indj.settings import DEFAULT_DJANGO_VERSION
 from indj.index import DjangoSrc, DjangoIndex, DjangoJson
 from indj.exceptions import LookupHandlerError
+from indj.pack import DjangoPack, write_pack
+from indj.handlers import (
+    ExportHandler, OverlayHandler, SharedHandler, StackedLookupHandler)
 
 
 class TestLookupHandler:
@@ -46,6 +49,126 @@ class TestLookupHandler:
     #    assert lookup.version == DEFAULT_DJANGO_VERSION
 
 
+    def test_get_django_json_returns_json_for_version(self, data_files, lookup):
+        output, package = data_files
+        lookup.settings.DATA_DIRECTORIES = [output, package]
+        django_json = lookup.get_django_json()
+        assert isinstance(django_json, DjangoJson)
+        assert django_json.filepath == os.path.join(output, 'django-1-2-3-final-4.json')
+
+    def test_lookup_returns_import_paths(self, data_files, lookup):
+        output, package = data_files
+        lookup.settings.DATA_DIRECTORIES = [output, package]
+        assert lookup.lookup('Thing') == ['foobars.Thing', 'dohickies.Thing']
+        assert lookup.lookup('Nope') == []
+
+    def test_lookup_does_not_load_index_for_misses(self, index, tmpdir, lookup, monkeypatch):
+        index.settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir)]
+
+        def fail(self):
+            raise AssertionError('index should not be loaded')
+        monkeypatch.setattr(DjangoJson, 'data', property(fail))
+        assert lookup.lookup('Nope') == []
+
+    def test_lookup_falls_back_to_bundled_pack(self, lookup, djson, tmpdir, monkeypatch):
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir.mkdir('empty'))]
+        filepath = os.path.join(str(tmpdir), 'django.pack')
+        write_pack(djson, filepath, lookup.settings)
+        monkeypatch.setattr(
+            lookup, 'get_django_pack', lambda: DjangoPack.from_filepath(filepath))
+        assert lookup.lookup('Thing') == ['foobars.Thing', 'dohickies.Thing']
+        assert lookup.lookup('Nope') == []
+        assert lookup.index_format == 'pack'
+        assert lookup.get_index_data().get('PewPew') == ['foobars.PewPew']
+
+    def test_lookup_abbreviation_ranks_matches(self, index, tmpdir, lookup):
+        index.settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+        index.version = (1, 2, 3, 'final', 4)
+        index.data = {
+            'HttpResponseRedirect': ['django.http.HttpResponseRedirect'],
+            'has_request_route': ['django.things.has_request_route'],
+            'get_object_or_404': ['django.shortcuts.get_object_or_404'],
+        }
+        index.save()
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir)]
+        assert lookup.lookup_abbreviation('HRR') == [
+            ('HttpResponseRedirect', ['django.http.HttpResponseRedirect']),
+            ('has_request_route', ['django.things.has_request_route'])]
+        assert lookup.lookup_abbreviation('GOO404') == [
+            ('get_object_or_404', ['django.shortcuts.get_object_or_404'])]
+        assert lookup.lookup_abbreviation('XYZ') == []
+
+    def test_lookup_suffix_ranks_exact_matches_first(self, index, tmpdir, lookup):
+        index.settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+        index.version = (1, 2, 3, 'final', 4)
+        index.data = {
+            'ModelForm': [
+                'django.forms.models.ModelForm', 'django.forms.ModelForm'],
+            'Q': ['django.db.models.Q', 'django.db.models.query_utils.Q'],
+        }
+        index.save()
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir)]
+        assert lookup.lookup_suffix('forms.ModelForm') == [
+            'django.forms.ModelForm', 'django.forms.models.ModelForm']
+        assert lookup.lookup_suffix('db.models.Q') == [
+            'django.db.models.Q', 'django.db.models.query_utils.Q']
+        assert lookup.lookup_suffix('shortcuts.Q') == []
+        assert lookup.lookup_suffix('forms.Nope') == []
+
+    def test_lookup_suffix_in_bundled_pack(self, lookup, djson, tmpdir, monkeypatch):
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir.mkdir('empty'))]
+        filepath = os.path.join(str(tmpdir), 'django.pack')
+        write_pack(djson, filepath, lookup.settings)
+        monkeypatch.setattr(
+            lookup, 'get_django_pack', lambda: DjangoPack.from_filepath(filepath))
+        monkeypatch.setattr(
+            DjangoPack, 'items', lambda self: pytest.fail('pack was scanned'))
+        assert lookup.lookup_suffix('dohickies.Thing') == ['dohickies.Thing']
+
+    def test_lookup_uses_shared_pack(self, lookup, djson, tmpdir, monkeypatch):
+        lookup.settings.SHARED_DIRECTORY = str(tmpdir.join('shared'))
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir.mkdir('empty'))]
+        handler = SharedHandler(lookup.version, lookup.settings)
+        monkeypatch.setattr(handler, 'get_django_json', lambda: djson)
+        handler.publish()
+        with pytest.raises(LookupHandlerError):
+            lookup.lookup('Thing')
+        lookup.settings.SHARED_INDEX = True
+        assert lookup.lookup('Thing') == ['foobars.Thing', 'dohickies.Thing']
+        assert lookup.index_format == 'shared'
+        assert lookup.get_index_data().get('PewPew') == ['foobars.PewPew']
+        monkeypatch.setattr(
+            DjangoPack, 'items', lambda self: pytest.fail('pack was scanned'))
+        assert lookup.lookup_abbreviation('PP') == [('PewPew', ['foobars.PewPew'])]
+        assert lookup.lookup_suffix('foobars.Thing') == ['foobars.Thing']
+
+    def test_lookup_abbreviation_in_bundled_pack(self, lookup, djson, tmpdir, monkeypatch):
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir.mkdir('empty'))]
+        filepath = os.path.join(str(tmpdir), 'django.pack')
+        write_pack(djson, filepath, lookup.settings)
+        monkeypatch.setattr(
+            lookup, 'get_django_pack', lambda: DjangoPack.from_filepath(filepath))
+        monkeypatch.setattr(
+            DjangoPack, 'items', lambda self: pytest.fail('pack was scanned'))
+        assert lookup.lookup_abbreviation('PP') == [('PewPew', ['foobars.PewPew'])]
+
+    def test_lookup_without_any_index_raises_exception(self, lookup, tmpdir):
+        lookup.settings.DATA_DIRECTORIES = [str(tmpdir)]
+        with pytest.raises(LookupHandlerError):
+            lookup.lookup('Thing')
+        with pytest.raises(LookupHandlerError):
+            lookup.get_index_data()
+
+    def test_get_probable_versions_checks_every_directory(self, data_files, lookup):
+        output, package = data_files
+        lookup.settings.DATA_DIRECTORIES = [output, package]
+        assert lookup.get_probable_versions('Thing') == [
+            (1, 2, 3, 'final', 4), (3, 2, 1, 'alpha', 0)]
+
+
 class TestCreationHandler:
 
     def test_get_django_src_returns_django_src_object(self, creation):
@@ -70,3 +193,194 @@ class TestCreationHandler:
         assert create_index_data.called
         assert create_index_data.was_called_with(((), {'generator': 'generator'}))
         assert index_data.data == 'index_data'
+
+    def test_save_django_index_writes_definitions(self, creation, src, tmpdir, monkeypatch):
+        creation.settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+        monkeypatch.setattr(
+            creation, 'get_definitions_generator',
+            lambda django_src: iter([('Thing', 'django.foobars.models.Thing')]))
+        filepath = creation.save_django_index(src)
+        djson = DjangoJson(filepath, creation.settings)
+        assert djson.get_index_data() == {'Thing': ['django.foobars.models.Thing']}
+        assert djson.get_version() == (1, 2, 3, 'final', 4)
+
+
+class TestStackedLookupHandler:
+
+    def get_handler(self, data_files, overlay_file, index_settings):
+        output, package = data_files
+        index_settings.DATA_DIRECTORIES = [output, package]
+        return StackedLookupHandler(
+            (1, 2, 3, 'final', 4), index_settings, overlays=[overlay_file])
+
+    def test_overlays_default_to_settings(self, index_settings):
+        index_settings.OVERLAY_FILEPATHS = ['overlay.json']
+        handler = StackedLookupHandler((1, 2, 3, 'final', 4), index_settings)
+        assert handler.overlays == ['overlay.json']
+
+    def test_lookup_merges_overlay_first(self, data_files, overlay_file, index_settings):
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        assert handler.lookup('Thing') == [
+            'myapp.models.Thing', 'foobars.Thing', 'dohickies.Thing']
+        assert handler.lookup('Widget') == ['myapp.widgets.Widget']
+        assert handler.lookup('PewPew') == ['foobars.PewPew']
+        assert handler.lookup('Nope') == []
+
+    def test_lookup_merges_base_first(self, data_files, overlay_file, index_settings):
+        index_settings.OVERLAY_PRECEDENCE = 'base'
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        assert handler.lookup('Thing') == [
+            'foobars.Thing', 'dohickies.Thing', 'myapp.models.Thing']
+
+    def test_lookup_shadows_lower_layers(self, data_files, overlay_file, index_settings):
+        index_settings.OVERLAY_MERGE = 'shadow'
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        assert handler.lookup('Thing') == ['myapp.models.Thing']
+        assert handler.lookup('PewPew') == ['foobars.PewPew']
+
+    def test_lookup_overlay_skips_names_missing_from_bloom_filter(self, tmpdir, index_settings, monkeypatch):
+        overlay = OverlayHandler(str(tmpdir), index_settings)
+        monkeypatch.setattr(
+            overlay.get_project_src().__class__, 'definitions_generator',
+            lambda self, filepaths: iter([('Widget', 'myapp.Widget')]))
+        overlay.save_overlay()
+        handler = StackedLookupHandler(
+            (1, 2, 3, 'final', 4), index_settings, overlays=[overlay.filepath])
+        monkeypatch.setattr(
+            DjangoJson, 'get_index_data',
+            lambda self: pytest.fail('overlay data should not be loaded'))
+        assert handler.lookup_overlay(overlay.filepath, 'Nope') == []
+
+
+    def test_lookup_without_django_index_uses_overlays(self, data_files, overlay_file, index_settings):
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        handler.version = (9, 9, 9, 'final', 0)
+        assert handler.lookup('Widget') == ['myapp.widgets.Widget']
+        assert handler.lookup_many(['Widget', 'Nope']) == {
+            'Widget': ['myapp.widgets.Widget'], 'Nope': []}
+        with pytest.raises(LookupHandlerError):
+            handler.lookup('Nope')
+
+    def test_lookup_abbreviation_includes_overlays(self, data_files, overlay_file, index_settings):
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        assert handler.lookup_abbreviation('PP') == [
+            ('PewPew', ['foobars.PewPew'])]
+        assert handler.lookup_abbreviation('W') == [
+            ('Widget', ['myapp.widgets.Widget'])]
+        handler.version = (9, 9, 9, 'final', 0)
+        assert handler.lookup_abbreviation('W') == [
+            ('Widget', ['myapp.widgets.Widget'])]
+        with pytest.raises(LookupHandlerError):
+            handler.lookup_abbreviation('PP')
+
+    def test_lookup_suffix_includes_overlays(self, data_files, overlay_file, index_settings):
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        assert handler.lookup_suffix('models.Thing') == ['myapp.models.Thing']
+        assert handler.lookup_suffix('foobars.Thing') == ['foobars.Thing']
+        handler.version = (9, 9, 9, 'final', 0)
+        assert handler.lookup_suffix('widgets.Widget') == ['myapp.widgets.Widget']
+        with pytest.raises(LookupHandlerError):
+            handler.lookup_suffix('foobars.Thing')
+
+    def test_missing_overlay_raises_lookup_handler_error(self, data_files, tmpdir, index_settings):
+        missing = str(tmpdir.join('nope.json'))
+        handler = self.get_handler(data_files, missing, index_settings)
+        message = 'Could not read overlay `{0}`: '.format(missing)
+        for lookup, query in [(handler.lookup, 'Thing'),
+                              (handler.lookup_abbreviation, 'PP'),
+                              (handler.lookup_suffix, 'foobars.Thing'),
+                              (handler.lookup_many, ['Thing'])]:
+            with pytest.raises(LookupHandlerError) as errinfo:
+                lookup(query)
+            assert errinfo.value.args[0].startswith(message)
+
+    def test_lookup_many_merges_layers(self, data_files, overlay_file, index_settings):
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        assert handler.lookup_many(['Thing', 'Widget', 'Nope']) == {
+            'Thing': ['myapp.models.Thing', 'foobars.Thing', 'dohickies.Thing'],
+            'Widget': ['myapp.widgets.Widget'],
+            'Nope': []}
+
+    def test_lookup_many_shadows_lower_layers(self, data_files, overlay_file, index_settings):
+        index_settings.OVERLAY_MERGE = 'shadow'
+        index_settings.OVERLAY_PRECEDENCE = 'base'
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        assert handler.lookup_many(['Thing', 'Widget']) == {
+            'Thing': ['foobars.Thing', 'dohickies.Thing'],
+            'Widget': ['myapp.widgets.Widget']}
+
+    def test_get_layer_data_loads_each_index_once(self, data_files, overlay_file, index_settings, monkeypatch):
+        handler = self.get_handler(data_files, overlay_file, index_settings)
+        handler.get_layer_data()
+        monkeypatch.setattr(
+            DjangoJson, 'get_index_data',
+            lambda self: pytest.fail('index should not be loaded again'))
+        assert len(handler.get_layer_data()) == 2
+
+
+class TestOverlayHandler:
+
+    def test_filepath_defaults_to_project(self, index_settings):
+        overlay = OverlayHandler('myproject', index_settings)
+        assert overlay.filepath == os.path.join('myproject', '.indj-overlay.json')
+
+    def test_save_overlay_indexes_project(self, index_settings, monkeypatch, tmpdir):
+        test_dir = os.path.dirname(__file__)
+        filepath = os.path.join(str(tmpdir), 'overlay.json')
+        overlay = OverlayHandler(
+            os.path.join(test_dir, 'mockdjango'), index_settings, filepath)
+        project_src = overlay.get_project_src()
+
+        def definitions(path):
+            module_import_path = project_src._get_module_import_path(path)
+            return [('Thing', project_src._get_import_path('Thing', module_import_path))]
+        monkeypatch.setattr(project_src, '_get_definitions_from_file', definitions)
+        monkeypatch.setattr(overlay, 'get_project_src', lambda: project_src)
+        assert overlay.save_overlay() == filepath
+        data = DjangoJson(filepath, index_settings).get_index_data()
+        assert sorted(data['Thing']) == [
+            'Thing', 'foobars.Thing', 'foobars.models.Thing', 'foobars.pewpew.Thing']
+        assert overlay.save_overlay() == filepath
+
+
+class TestExportHandler:
+
+    def test_export_tags_writes_tags_from_index(self, data_files, index_settings, tmpdir):
+        output, package = data_files
+        index_settings.DATA_DIRECTORIES = [output, package]
+        export = ExportHandler((3, 2, 1, 'alpha', 0), index_settings)
+        tags_filepath = os.path.join(str(tmpdir), 'tags')
+        assert export.export_tags(tags_filepath) is True
+        contents = open(tags_filepath).read()
+        assert 'PewPew\t' in contents
+        assert os.path.join(package, 'django-3-2-1-alpha-0.json') in contents
+        assert export.export_tags(tags_filepath) is False
+
+    def test_get_source_directory_only_uses_installed_django_of_version(self, index_settings):
+        index_settings.DJANGO_DIRECTORY = '/django'
+        index_settings.DJANGO_VERSION = (1, 2, 3, 'final', 4)
+        assert ExportHandler(
+            (1, 2, 3, 'final', 4), index_settings).get_source_directory() == '/django'
+        assert ExportHandler(
+            (3, 2, 1, 'alpha', 0), index_settings).get_source_directory() is None
+
+    def test_get_source_directory_checks_given_version(self, index_settings):
+        mockdjango = os.path.join(
+            os.path.dirname(os.path.realpath(__file__)), 'mockdjango')
+        export = ExportHandler((1, 2, 3, 'final', 4), index_settings)
+        assert export.get_source_directory(mockdjango) == mockdjango
+        export = ExportHandler((3, 2, 1, 'alpha', 0), index_settings)
+        with pytest.raises(LookupHandlerError) as errinfo:
+            export.get_source_directory(mockdjango)
+        assert errinfo.value.args == (
+            'The django in `{0}` is not version `3-2-1-alpha-0`'.format(
+                mockdjango), )
+
+    def test_export_pack_writes_pack_from_index(self, data_files, index_settings, tmpdir):
+        output, package = data_files
+        index_settings.DATA_DIRECTORIES = [output, package]
+        export = ExportHandler((3, 2, 1, 'alpha', 0), index_settings)
+        filepath = export.export_pack(os.path.join(str(tmpdir), 'django.pack'))
+        django_pack = DjangoPack.from_filepath(filepath)
+        assert django_pack.version == (3, 2, 1, 'alpha', 0)
+        assert django_pack.get('PewPew') == ['foobars.PewPew']
@@ -1,8 +1,15 @@
 import pytest
 import os
+import json
 import types
 from datetime import datetime
+from indj.abbrev import build_abbreviations
+from indj.bloom import BloomFilter
 from indj.exceptions import DjangoIndexError
+from indj import index
+from indj.index import (
+    DjangoJson, DjangoSrc, DjangoSummary, ProjectSrc, _JsonStream)
+from indj.suffix import build_suffixes
 
 
 class TestDjangoIndex:
@@ -10,6 +17,29 @@ class TestDjangoIndex:
     def test_names(self, index):
         assert index.names == ['DjangoThing', 'DjangoWotsit']
 
+    def test_add_definitions_adds_new_names_and_paths(self, index):
+        index.add_definitions([
+            ('DjangoThing', 'django.other.DjangoThing'),
+            ('DjangoThing', 'django.things.DjangoThing'),
+            ('Foo', 'django.things.Foo')])
+        assert index.data['DjangoThing'] == [
+            'django.things.DjangoThing',
+            'django.shortcuts.DjangoThing',
+            'django.other.DjangoThing']
+        assert index.data['Foo'] == ['django.things.Foo']
+
+    def test_remove_definitions_removes_paths(self, index):
+        index.remove_definitions([
+            ('DjangoThing', 'django.things.DjangoThing'),
+            ('Nope', 'django.things.Nope')])
+        assert index.data['DjangoThing'] == ['django.shortcuts.DjangoThing']
+
+    def test_remove_definitions_removes_names_without_paths(self, index):
+        index.remove_definitions([
+            ('DjangoThing', 'django.things.DjangoThing'),
+            ('DjangoThing', 'django.shortcuts.DjangoThing')])
+        assert 'DjangoThing' not in index.data
+
     def test_validate_raises_exception_with_no_data(self, index):
         index.data = None
         with pytest.raises(DjangoIndexError) as exceptinfo:
@@ -60,6 +90,25 @@ class TestDjangoIndex:
         assert 'created' in index.to_dict()
         assert index.to_dict()['created'] == datetime(2015, 3, 24, 23, 59, 59)
 
+    def test_to_dict_puts_header_before_data(self, index):
+        assert list(index.to_dict().keys()) == [
+            'bloom', 'version', 'created', 'data', 'abbreviations', 'suffixes']
+
+    def test_get_abbreviations(self, index):
+        assert index.get_abbreviations() == {
+            'dt': ['DjangoThing'], 'dw': ['DjangoWotsit']}
+
+    def test_get_suffixes(self, index):
+        assert index.get_suffixes() == [
+            'DjangoThing.shortcuts.django', 'DjangoThing.things.django',
+            'DjangoWotsit.shortcuts.django', 'DjangoWotsit.things.django']
+
+    def test_get_bloom_filter_contains_names(self, index):
+        bloom = index.get_bloom_filter()
+        assert 'DjangoThing' in bloom
+        assert 'DjangoWotsit' in bloom
+        assert 'Nope' not in bloom
+
     def test_is_valid_returns_false_with_invalid_data(self, index):
         index.data = None
         assert not index.is_valid
@@ -103,6 +152,187 @@ class TestDjangoIndex:
         index.save()
         assert mocked.called
 
+    def test_save_leaves_no_temporary_files(self, index, tmpdir):
+        index.settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        assert sorted(os.listdir(str(tmpdir))) == [
+            'django-1-2-3-final-4.json', 'summary.json']
+
+    def test_save_keeps_existing_file_when_writing_fails(self, index, tmpdir, monkeypatch):
+        index.settings.JSON_OUTPUT_DIRECTORY = str(tmpdir)
+        index.version = (1, 2, 3, 'final', 4)
+        filepath = os.path.join(str(tmpdir), 'django-1-2-3-final-4.json')
+        open(filepath, 'w').write('foo')
+        monkeypatch.setattr(index, 'to_dict', lambda: {'bad': object()})
+        with pytest.raises(TypeError):
+            index.save(overwrite=True)
+        assert open(filepath).read() == 'foo'
+        assert os.listdir(str(tmpdir)) == ['django-1-2-3-final-4.json']
+
+
+class TestDjangoIndexWriter:
+
+    def test_add_spills_sorted_run_when_buffer_is_full(self, writer):
+        writer.add('Thing', 'foobars.Thing')
+        assert len(writer._runs) == 0
+        writer.add('Foo', 'foobars.Foo')
+        assert len(writer._runs) == 1
+        assert writer._buffer == []
+        lines = [json.loads(line) for line in writer._runs[0]]
+        assert lines == [['Foo', 1, 'foobars.Foo', False],
+                         ['Thing', 0, 'foobars.Thing', False]]
+
+    def test_grouped_merges_runs_by_name(self, writer):
+        for name, path in [('Thing', 'foobars.Thing'),
+                           ('Foo', 'foobars.Foo'),
+                           ('Thing', 'dohickies.Thing'),
+                           ('Bar', 'foobars.Bar'),
+                           ('Foo', 'dohickies.Foo')]:
+            writer.add(name, path)
+        assert list(writer.grouped()) == [
+            ('Bar', ['foobars.Bar']),
+            ('Foo', ['foobars.Foo', 'dohickies.Foo']),
+            ('Thing', ['foobars.Thing', 'dohickies.Thing'])]
+
+    def test_grouped_ignores_repeated_import_path(self, writer):
+        for name, path in [('Thing', 'foobars.Thing'),
+                           ('Foo', 'foobars.Foo'),
+                           ('Thing', 'foobars.Thing')]:
+            writer.add(name, path)
+        assert list(writer.grouped()) == [
+            ('Foo', ['foobars.Foo']),
+            ('Thing', ['foobars.Thing'])]
+
+    def test_write_creates_file_readable_by_django_json(self, writer, tmpdir):
+        generator = (_ for _ in [
+            ('Thing', 'foobars.Thing'),
+            ('PewPew', 'foobars.PewPew'),
+            ('Thing', 'dohickies.Thing')])
+        filepath = writer.write(generator)
+        assert filepath == os.path.join(str(tmpdir), 'django-1-2-3-final-4.json')
+        djson = DjangoJson(filepath, writer.settings)
+        assert djson.get_index_data() == {
+            'Thing': ['foobars.Thing', 'dohickies.Thing'],
+            'PewPew': ['foobars.PewPew']}
+        assert djson.get_version() == (1, 2, 3, 'final', 4)
+        assert djson.get_created() == datetime(2015, 4, 18, 12, 30, 45)
+
+    def test_write_puts_header_before_data(self, writer):
+        generator = (_ for _ in [('Thing', 'a.Thing'), ('Foo', 'a.Foo')])
+        filepath = writer.write(generator)
+        djson = DjangoJson(filepath, writer.settings)
+        header = djson.get_header()
+        assert sorted(header.keys()) == ['bloom', 'created', 'version']
+        assert header['version'] == [1, 2, 3, 'final', 4]
+        bloom = djson.get_bloom_filter()
+        assert 'Thing' in bloom
+        assert 'Foo' in bloom
+        assert 'Nope' not in bloom
+
+    def test_write_adds_abbreviations(self, writer):
+        generator = (_ for _ in [('HttpResponse', 'a.HttpResponse'), ('Q', 'a.Q')])
+        djson = DjangoJson(writer.write(generator), writer.settings)
+        assert djson.get_abbreviations() == {'hr': ['HttpResponse']}
+        assert djson.get_index_data() == {
+            'HttpResponse': ['a.HttpResponse'], 'Q': ['a.Q']}
+
+    def test_write_adds_suffixes(self, writer):
+        generator = (_ for _ in [('Q', 'a.b.Q'), ('F', 'a.F'), ('Q', 'a.Q')])
+        djson = DjangoJson(writer.write(generator), writer.settings)
+        assert djson.get_suffixes() == ['F.a', 'Q.a', 'Q.b.a']
+
+    def test_write_sorts_abbreviations_through_spills(self, writer):
+        definitions = [
+            ('HttpResponseRedirect', 'django.http.HttpResponseRedirect'),
+            ('has_request_route', 'django.things.has_request_route'),
+            ('HttpRequest', 'django.http.request.HttpRequest'),
+            ('HttpResponseRedirect', 'django.shortcuts.HttpResponseRedirect'),
+            ('HttpRequest', 'django.http.HttpRequest'),
+            ('Q', 'django.db.models.Q'),
+        ]
+        djson = DjangoJson(
+            writer.write(iter(definitions)), writer.settings)
+        assert djson.get_abbreviations() == build_abbreviations(
+            djson.get_index_data())
+        assert djson.get_abbreviations()['hrr'] == [
+            'HttpResponseRedirect', 'has_request_route']
+
+    def test_write_sorts_suffixes_through_spills(self, writer):
+        definitions = [
+            ('Q', 'django.db.models.Q'),
+            ('HttpRequest', 'django.http.request.HttpRequest'),
+            ('Q', 'django.db.models.query_utils.Q'),
+            ('HttpRequest', 'django.http.HttpRequest'),
+            ('F', 'django.db.models.F'),
+        ]
+        djson = DjangoJson(
+            writer.write(iter(definitions)), writer.settings)
+        assert djson.get_suffixes() == build_suffixes(
+            path for _, path in definitions)
+
+    def test_write_sizes_bloom_filter_from_distinct_names(self, writer):
+        generator = (_ for _ in [
+            ('Thing', 'a.Thing'), ('Thing', 'b.Thing'), ('Thing', 'c.Thing'),
+            ('Foo', 'a.Foo')])
+        djson = DjangoJson(writer.write(generator), writer.settings)
+        expected = BloomFilter.for_capacity(2, writer.settings.BLOOM_ERROR_RATE)
+        assert djson.get_bloom_filter().size == expected.size
+
+    def test_write_updates_directory_summary(self, writer, tmpdir):
+        writer.write((_ for _ in [('Thing', 'a.Thing')]))
+        summary = DjangoSummary(str(tmpdir), writer.settings)
+        assert summary.probable_versions('Thing') == [(1, 2, 3, 'final', 4)]
+
+    def test_write_ranks_paths(self, writer):
+        generator = (_ for _ in [('Thing', 'a.Thing'), ('Thing', 'b.Thing')])
+        filepath = writer.write(
+            generator, rank=lambda name, paths, definitions: paths[::-1])
+        djson = DjangoJson(filepath, writer.settings)
+        assert djson.get_index_data() == {'Thing': ['b.Thing', 'a.Thing']}
+
+    def test_write_carries_definitions_through_spills_to_rank(self, writer):
+        generator = (_ for _ in [
+            ('Thing', 'a.Thing', False), ('Foo', 'a.Foo', True),
+            ('Thing', 'b.Thing', True), ('Thing', 'a.Thing', True),
+            ('Thing', 'c.Thing', False)])
+        ranked = {}
+
+        def rank(name, paths, definitions):
+            ranked[name] = definitions
+            return paths
+        writer.write(generator, rank=rank)
+        assert ranked == {
+            'Foo': set(['a.Foo']), 'Thing': set(['a.Thing', 'b.Thing'])}
+
+    def test_write_to_given_filepath(self, writer, tmpdir):
+        filepath = os.path.join(str(tmpdir), 'overlay.json')
+        assert writer.write(iter([('Thing', 'a.Thing')]), filepath=filepath) == filepath
+        assert DjangoJson(filepath, writer.settings).get_index_data() == {
+            'Thing': ['a.Thing']}
+        assert sorted(os.listdir(str(tmpdir))) == ['overlay.json']
+        with pytest.raises(DjangoIndexError) as errinfo:
+            writer.write(iter([]), filepath=filepath)
+        assert errinfo.value.args == ('Output file already exists', )
+
+    def test_write_closes_runs(self, writer):
+        generator = (_ for _ in [('Thing', 'foobars.Thing'), ('Foo', 'foobars.Foo')])
+        writer.write(generator)
+        assert writer._runs == []
+
+    def test_write_throws_error_when_data_filepath_exists(self, writer, tmpdir):
+        filepath = os.path.join(str(tmpdir), 'django-1-2-3-final-4.json')
+        open(filepath, 'w').write('foo')
+        with pytest.raises(DjangoIndexError) as errinfo:
+            writer.write(iter([]))
+        assert errinfo.value.args == ('Output file already exists', )
+
+    def test_write_throws_error_if_output_directory_doesnt_exist(self, writer, tmpdir):
+        tmpdir.remove()
+        with pytest.raises(DjangoIndexError) as errinfo:
+            writer.write(iter([]))
+        assert errinfo.value.args == ('Output directory does not exist', )
+
 
 class TestDjangoSrc:
 
@@ -179,6 +409,140 @@ class TestDjangoSrc:
         assert name == 'That'
         assert import_path == 'django.foobars.That'
 
+    def test__get_module_info_finds_definitions(self, src):
+        info = src._get_module_info(
+            'class Thing:\n    pass\ndef thing():\n    pass\nTHING = 1\n',
+            'django.foobars', True)
+        assert info['defined'] == set(['Thing', 'thing', 'THING'])
+        assert info['all'] is None
+        assert info['imports'] == {}
+
+    def test__get_module_info_finds_all(self, src):
+        info = src._get_module_info(
+            "__all__ = ['Thing']\n__all__ += ['That']\n",
+            'django.foobars', True)
+        assert info['all'] == set(['Thing', 'That'])
+        assert info['defined'] == set()
+
+    def test__get_module_info_resolves_imports(self, src):
+        info = src._get_module_info(
+            'from .models import Thing\n'
+            'from ..http import Response as Resp\n'
+            'from django.db import models\n',
+            'django.foobars.views', False)
+        assert info['imports'] == {
+            'Thing': ('django.foobars.models', 'Thing'),
+            'Resp': ('django.http', 'Response'),
+            'models': ('django.db', 'models')}
+
+    def test__get_module_info_resolves_imports_in_package(self, src):
+        info = src._get_module_info(
+            'from .models import Thing\n', 'django.foobars', True)
+        assert info['imports'] == {
+            'Thing': ('django.foobars.models', 'Thing')}
+
+    def test__get_module_info_ignores_syntax_errors(self, src):
+        info = src._get_module_info('print "pewpew"\n', 'django', True)
+        assert info == {'defined': set(), 'all': None, 'imports': {}}
+
+    def test__get_origin_follows_reexport_chain(self, src):
+        src.modules = {
+            'django.shortcuts': src._get_module_info(
+                'from django.http import Response\n', 'django.shortcuts', False),
+            'django.http': src._get_module_info(
+                'from .response import Response\n', 'django.http', True),
+            'django.http.response': src._get_module_info(
+                'class Response:\n    pass\n', 'django.http.response', False),
+        }
+        assert src._get_origin('Response', 'django.shortcuts') == (
+            'django.http.response', 'Response')
+
+    def test__get_origin_stops_on_cycles(self, src):
+        src.modules = {
+            'django.a': src._get_module_info('from django.b import X\n', 'django.a', False),
+            'django.b': src._get_module_info('from django.a import X\n', 'django.b', False),
+        }
+        assert src._get_origin('X', 'django.a') in [('django.a', 'X'), ('django.b', 'X')]
+
+    def test_rank_paths_prefers_public_reexport_in_all(self, src):
+        src.modules = {
+            'django.http': src._get_module_info(
+                "from django.http.response import Response\n__all__ = ['Response']\n",
+                'django.http', True),
+            'django.http.response': src._get_module_info(
+                'class Response:\n    pass\n', 'django.http.response', False),
+            'django.core._private': src._get_module_info(
+                'from django.http.response import Response\n',
+                'django.core._private', False),
+        }
+        paths = ['django.http.response.Response',
+                 'django.core._private.Response',
+                 'django.http.Response']
+        assert src.rank_paths('Response', paths) == [
+            'django.http.Response',
+            'django.http.response.Response',
+            'django.core._private.Response']
+
+    def test_rank_paths_prefers_defining_module_at_same_depth(self, src):
+        src.modules = {
+            'django.a': src._get_module_info('from django.b import X\n', 'django.a', False),
+            'django.b': src._get_module_info('X = 1\n', 'django.b', False),
+        }
+        assert src.rank_paths('X', ['django.a.X', 'django.b.X']) == [
+            'django.b.X', 'django.a.X']
+
+    def test_rank_paths_keeps_reexports_with_their_definition(self, src):
+        src.modules = {
+            'django.forms': src._get_module_info(
+                'from django.forms.fields import Field\n', 'django.forms', True),
+            'django.forms.fields': src._get_module_info(
+                'class Field:\n    pass\n', 'django.forms.fields', False),
+            'django.db.models': src._get_module_info(
+                'class Field:\n    pass\n', 'django.db.models', True),
+        }
+        paths = ['django.db.models.Field',
+                 'django.forms.fields.Field',
+                 'django.forms.Field']
+        assert src.rank_paths('Field', paths) == [
+            'django.forms.Field',
+            'django.forms.fields.Field',
+            'django.db.models.Field']
+
+    def test_create_index_data_ranks_import_paths(self, src):
+        src.modules = {
+            'django.foobars.models': src._get_module_info(
+                'class Thing:\n    pass\n', 'django.foobars.models', False),
+            'django.foobars': src._get_module_info(
+                'from .models import Thing\n', 'django.foobars', True),
+        }
+        fake_generator = (_ for _ in [
+            ('Thing', 'django.foobars.models.Thing'),
+            ('Thing', 'django.foobars.Thing')])
+        data = src.create_index_data(fake_generator)
+        assert data['Thing'] == ['django.foobars.Thing', 'django.foobars.models.Thing']
+
+    def test_definitions_generator_flags_definitions_without_keeping_them(self, tmpdir, index_settings, monkeypatch):
+        tmpdir.join('a.py').write('from .b import X\n')
+        tmpdir.join('b.py').write('class X:\n    pass\n')
+
+        class Definition(object):
+            def __init__(self, name):
+                self.name = self.full_name = name
+
+        class FakeJedi(object):
+            @staticmethod
+            def defined_names(source):
+                return [Definition('X')]
+        monkeypatch.setattr(index, 'jedi', FakeJedi)
+        src = DjangoSrc(str(tmpdir), index_settings)
+        filepaths = [str(tmpdir.join('a.py')), str(tmpdir.join('b.py'))]
+        assert list(src.definitions_generator(filepaths)) == [
+            ('X', 'django.a.X', False), ('X', 'django.b.X', True)]
+        assert all('defined' not in info for info in src.modules.values())
+        assert src.rank_paths(
+            'X', ['django.a.X', 'django.b.X'], set(['django.b.X'])) == [
+            'django.b.X', 'django.a.X']
+
     def test_version_finder_matches_python_version_definition(self, src):
         version = src.version_finder.search("VERSION = (1, 2, 3, 'final', 4)")
         assert version is not None
@@ -273,6 +637,27 @@ class TestDjangoSrc:
         assert data['Thing'] == ['foobars.Thing']
 
 
+class TestProjectSrc:
+
+    def test__get_module_import_path_has_no_package(self, index_settings):
+        src = ProjectSrc('tests/mockdjango', index_settings)
+        assert src._get_module_import_path(
+            'tests/mockdjango/foobars/models.py') == 'foobars.models'
+        assert src._get_module_import_path(
+            'tests/mockdjango/foobars/__init__.py') == 'foobars'
+        assert src._get_module_import_path('tests/mockdjango/__init__.py') == ''
+
+    def test__get_import_path_without_module(self, index_settings):
+        src = ProjectSrc('tests/mockdjango', index_settings)
+        assert src._get_import_path('Thing', '') == 'Thing'
+        assert src._get_import_path('Thing', 'foobars') == 'foobars.Thing'
+
+    def test_get_version_returns_django_version(self, index_settings):
+        index_settings.DJANGO_VERSION = (1, 8, 0, 'final', 0)
+        src = ProjectSrc('tests/mockdjango', index_settings)
+        assert src.get_version() == (1, 8, 0, 'final', 0)
+
+
 class TestDjangoJson:
     data = {
         'data': {
@@ -298,6 +683,46 @@ class TestDjangoJson:
     def test_get_index_data_returns_data(self, djson):
         assert djson.get_index_data() == self.data['data']
 
+    def test_iter_index_data_streams_data(self, djson):
+        assert dict(djson.iter_index_data()) == self.data['data']
+        assert djson._data is None
+
+    def test_iter_index_data_reads_across_chunks(self, djson, monkeypatch):
+        monkeypatch.setattr(_JsonStream, 'chunk_size', 3)
+        assert dict(djson.iter_index_data()) == self.data['data']
+
+    def test_iter_index_data_skips_keys_before_data(self, djson):
+        with open(djson.filepath, 'w') as fh:
+            fh.write('{"version": [1, 2, 3], "created": "x", "data": {"Thing": ["foobars.Thing"]}}')
+        assert list(djson.iter_index_data()) == [('Thing', ['foobars.Thing'])]
+
+    def test_iter_index_data_raises_exception_with_truncated_file(self, djson):
+        with open(djson.filepath, 'w') as fh:
+            fh.write('{"data": {"Thing": ["foobars.Thing"]')
+        with pytest.raises(DjangoIndexError):
+            list(djson.iter_index_data())
+
+    def test_iter_index_data_uses_loaded_data(self, djson):
+        djson._data = {'data': {'Foo': ['foobars.Foo']}}
+        assert list(djson.iter_index_data()) == [('Foo', ['foobars.Foo'])]
+
+    def test_get_abbreviations_without_stored_abbreviations(self, djson):
+        assert djson.get_abbreviations() == {'pp': ['PewPew'], 't': ['Thing']}
+
+    def test_get_suffixes_without_stored_suffixes(self, djson):
+        assert djson.get_suffixes() == [
+            'PewPew.foobars', 'Thing.dohickies', 'Thing.foobars']
+
+    def test_get_header_without_header_is_empty(self, djson):
+        assert djson.get_header() == {}
+        assert djson.get_bloom_filter() is None
+
+    def test_get_header_uses_loaded_data(self, djson):
+        djson.data
+        assert djson.get_header() == {
+            'version': [1, 2, 3, 'final', 4],
+            'created': '2015-04-18T12:30:45'}
+
     def test_get_version_returns_tuple(self, djson):
         expected_version = (1, 2, 3, 'final', 4)
         version = djson.get_version()
@@ -309,3 +734,80 @@ class TestDjangoJson:
         created = djson.get_created()
         assert isinstance(created, datetime)
         assert expected_created == created
+
+    def test_get_created_handles_microseconds(self, djson):
+        djson.data['created'] = '2015-04-18T12:30:45.123456'
+        assert djson.get_created() == datetime(2015, 4, 18, 12, 30, 45, 123456)
+
+
+class TestDjangoSummary:
+
+    def test_refresh_summarises_indexes(self, summary, index):
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        indexes = summary.refresh()
+        assert list(indexes.keys()) == ['django-1-2-3-final-4.json']
+        entry = indexes['django-1-2-3-final-4.json']
+        assert entry['version'] == [1, 2, 3, 'final', 4]
+        assert entry['bloom'] is not None
+        assert os.path.exists(summary.filepath)
+
+    def test_refresh_reads_indexes_without_header(self, summary, index_data):
+        filepath = os.path.join(summary.directory, 'django-1-2-3-final-4.json')
+        with open(filepath, 'w') as fh:
+            json.dump(index_data, fh)
+        entry = summary.refresh()['django-1-2-3-final-4.json']
+        assert entry['version'] == [1, 2, 3, 'final', 4]
+        assert entry['bloom'] is None
+        assert summary.might_contain('django-1-2-3-final-4.json', 'Nope')
+
+    def test_refresh_ignores_invalid_indexes(self, summary):
+        filepath = os.path.join(summary.directory, 'django-1-2-3-final-4.json')
+        open(filepath, 'w').write('foo')
+        entry = summary.refresh()['django-1-2-3-final-4.json']
+        assert entry['version'] is None
+        assert summary.probable_versions('Thing') == []
+
+    def test_refresh_only_rereads_changed_indexes(self, summary, index, monkeypatch):
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        summary.refresh()
+
+        def fail(filepath, signature):
+            raise AssertionError('should not be summarised')
+        monkeypatch.setattr(summary, '_summarise', fail)
+        summary.refresh()
+
+    def test_refresh_drops_removed_indexes(self, summary, index):
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        os.remove(os.path.join(summary.directory, 'django-1-2-3-final-4.json'))
+        assert summary.refresh() == {}
+        assert summary.load() == {}
+
+    def test_refresh_survives_read_only_directories(self, summary, index, monkeypatch):
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        os.remove(summary.filepath)
+
+        def read_only(filepath, mode='w'):
+            raise IOError('read only')
+        monkeypatch.setattr('indj.utils.atomic_open', read_only)
+        assert 'django-1-2-3-final-4.json' in summary.refresh()
+
+    def test_might_contain(self, summary, index):
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        assert summary.might_contain('django-1-2-3-final-4.json', 'DjangoThing')
+        assert not summary.might_contain('django-1-2-3-final-4.json', 'Nope')
+        assert summary.might_contain('django-9-9-9-zeta-9.json', 'Nope')
+
+    def test_probable_versions(self, summary, index):
+        index.version = (1, 2, 3, 'final', 4)
+        index.save()
+        index.version = (1, 3, 0, 'final', 0)
+        index.data = {'Other': ['django.Other']}
+        index.save()
+        assert summary.probable_versions('DjangoThing') == [(1, 2, 3, 'final', 4)]
+        assert summary.probable_versions('Other') == [(1, 3, 0, 'final', 0)]
+        assert summary.probable_versions('Nope') == []
@@ -0,0 +1,198 @@
+import os
+import pytest
+from indj import main, trace
+
+
+def test_export_writes_tags_file(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    tags_filepath = os.path.join(str(tmpdir), 'tags')
+    main.main(['export', tags_filepath, '--django-version', '1-2-3-final-4'])
+    assert os.path.exists(tags_filepath)
+    main.main(['export', tags_filepath, '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == [
+        'Wrote {0}'.format(tags_filepath),
+        '{0} is up to date'.format(tags_filepath)]
+
+
+def test_export_exits_when_index_is_missing(data_files, tmpdir, monkeypatch):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    with pytest.raises(SystemExit) as errinfo:
+        main.main(['export', str(tmpdir.join('tags')), '--django-version', '9-9-9-zeta-9'])
+    assert errinfo.value.args == (
+        'indj: No data file could be found for django version `9-9-9-zeta-9`', )
+
+
+def test_lookup_prints_import_paths(data_files, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    main.main(['Thing', '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == ['foobars.Thing', 'dohickies.Thing']
+
+
+def test_lookup_with_trace_records_stats(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    stats_filepath = os.path.join(str(tmpdir), 'stats.jsonl')
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    monkeypatch.setattr(main.Settings, 'STATS_FILEPATH', stats_filepath)
+    main.main(['Thing', '--django-version', '1-2-3-final-4', '--trace'])
+    _, err = capsys.readouterr()
+    phases = [line.split()[0] for line in err.splitlines()[1:]]
+    assert phases == ['imports', 'get_filepath', 'bloom', 'parse', 'index', 'lookup']
+
+    main.main(['stats', '--file', stats_filepath])
+    out, _ = capsys.readouterr()
+    rows = [line.split() for line in out.splitlines()[1:]]
+    assert [row[2] for row in rows] == [
+        'bloom', 'get_filepath', 'imports', 'index', 'lookup', 'parse']
+    assert all(row[0] == '1-2-3-final-4' and row[3] == '1' for row in rows)
+
+
+def test_trace_records_abbreviation_and_suffix_lookups(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    stats_filepath = os.path.join(str(tmpdir), 'stats.jsonl')
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    monkeypatch.setattr(main.Settings, 'STATS_FILEPATH', stats_filepath)
+    main.main(['PP', '-a', '--django-version', '1-2-3-final-4', '--trace'])
+    main.main(['foobars.Thing', '--django-version', '1-2-3-final-4', '--trace'])
+    out, _ = capsys.readouterr()
+    assert out == 'PewPew foobars.PewPew\nfoobars.Thing\n'
+    records = trace.load_records(stats_filepath)
+    assert [sorted(record['spans']) for record in records] == [
+        ['imports', 'lookup_abbreviation'], ['imports', 'lookup_suffix']]
+
+
+def test_trace_memory_is_not_recorded(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    stats_filepath = os.path.join(str(tmpdir), 'stats.jsonl')
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    monkeypatch.setattr(main.Settings, 'STATS_FILEPATH', stats_filepath)
+    main.main(['Thing', '--django-version', '1-2-3-final-4', '--trace-memory'])
+    _, err = capsys.readouterr()
+    assert err.splitlines()[0].split() == ['phase', 'ms', 'alloc', 'KiB']
+    assert not os.path.exists(stats_filepath)
+
+
+def test_stats_without_records(tmpdir, capsys):
+    stats_filepath = os.path.join(str(tmpdir), 'stats.jsonl')
+    main.main(['stats', '--file', stats_filepath])
+    out, _ = capsys.readouterr()
+    assert out == 'No lookups recorded in {0}\n'.format(stats_filepath)
+
+
+def test_lookup_with_overlay(data_files, overlay_file, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    main.main(['Thing', '--django-version', '1-2-3-final-4', '--overlay', overlay_file])
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == [
+        'myapp.models.Thing', 'foobars.Thing', 'dohickies.Thing']
+
+
+def test_resolve_prints_import_statements(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    project = str(tmpdir.mkdir('project'))
+    views = os.path.join(project, 'views.py')
+    with open(views, 'w') as fh:
+        fh.write('Thing(Nope)\n')
+    main.main(['resolve', project, '--django-version', '1-2-3-final-4', '--workers', '1'])
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == [
+        '{0}: from foobars import Thing'.format(views),
+        '{0}: # unresolved Nope'.format(views)]
+
+
+def test_compat_prints_versions_per_path(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    monkeypatch.setattr(main.Settings, 'JSON_OUTPUT_DIRECTORY', str(tmpdir.join('compat')))
+    main.main(['compat', 'PewPew'])
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == [
+        'foobars.PewPew: 1-2-3-final-4, 3-2-1-alpha-0 (since 1-2-3-final-4)']
+    main.main(['compat', 'PewPew', '--since', '2-0-0-final-0'])
+    out, _ = capsys.readouterr()
+    assert out.splitlines() == [
+        'foobars.PewPew: 3-2-1-alpha-0 (since 1-2-3-final-4)']
+
+
+def test_export_writes_pack(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    monkeypatch.chdir(str(tmpdir))
+    main.main(['export', '--format', 'pack', '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out == 'Wrote django-1-2-3-final-4.pack\n'
+    assert os.path.exists(os.path.join(str(tmpdir), 'django-1-2-3-final-4.pack'))
+
+
+def test_lookup_abbreviation(data_files, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    main.main(['PP', '-a', '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out == 'PewPew foobars.PewPew\n'
+
+
+def test_lookup_dotted_suffix(data_files, monkeypatch, capsys):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    main.main(['foobars.Thing', '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out == 'foobars.Thing\n'
+
+
+def test_share(data_files, tmpdir, monkeypatch, capsys):
+    output, package = data_files
+    shared = os.path.join(str(tmpdir), 'shared')
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    monkeypatch.setattr(main.Settings, 'SHARED_DIRECTORY', shared)
+    main.main(['share', '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out == 'Published {0}\n'.format(
+        os.path.join(shared, 'django-1-2-3-final-4.pack'))
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [])
+    monkeypatch.setattr(main.Settings, 'SHARED_INDEX', True)
+    main.main(['Thing', '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out == 'foobars.Thing\ndohickies.Thing\n'
+    main.main(['share', '--remove', '--django-version', '1-2-3-final-4'])
+    main.main(['share', '--remove', '--django-version', '1-2-3-final-4'])
+    out, _ = capsys.readouterr()
+    assert out == 'Removed 1-2-3-final-4\n1-2-3-final-4 is not published\n'
+
+
+def test_lookup_overlay_without_django_index(tmpdir, overlay_file, monkeypatch, capsys):
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [str(tmpdir)])
+    main.main(['Widget', '--overlay', overlay_file,
+               '--django-version', '9-9-9-final-0'])
+    out, _ = capsys.readouterr()
+    assert out == 'myapp.widgets.Widget\n'
+
+
+def test_lookup_exits_when_overlay_is_missing(data_files, tmpdir, monkeypatch):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    missing = str(tmpdir.join('nope.json'))
+    with pytest.raises(SystemExit) as errinfo:
+        main.main(['Thing', '--django-version', '1-2-3-final-4', '--overlay', missing])
+    assert errinfo.value.args[0].startswith(
+        'indj: Could not read overlay `{0}`: '.format(missing))
+
+
+def test_resolve_exits_when_overlay_is_missing(data_files, tmpdir, monkeypatch):
+    output, package = data_files
+    monkeypatch.setattr(main.Settings, 'DATA_DIRECTORIES', [output, package])
+    missing = str(tmpdir.join('nope.json'))
+    monkeypatch.setattr(main.Settings, 'OVERLAY_FILEPATHS', [missing])
+    project = str(tmpdir.mkdir('project'))
+    with open(os.path.join(project, 'views.py'), 'w') as fh:
+        fh.write('Thing(Nope)\n')
+    with pytest.raises(SystemExit) as errinfo:
+        main.main(['resolve', project, '--django-version', '1-2-3-final-4', '--workers', '1'])
+    assert errinfo.value.args[0].startswith(
+        'indj: Could not read overlay `{0}`: '.format(missing))
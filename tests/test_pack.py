@@ -0,0 +1,130 @@
+import io
+import struct
+import os
+import zipfile
+import pytest
+from indj.exceptions import DjangoIndexError
+from indj.suffix import find_suffix
+from indj.pack import (
+    DjangoPack, load_packaged, pack_filename, read_packaged, write_pack)
+
+
+@pytest.fixture
+def pack_bytes():
+    fh = io.BytesIO()
+    DjangoPack.write(fh, [1, 2, 3, 'final', 4], '2015-04-18T12:30:45', [
+        ('PewPew', ['foobars.PewPew']),
+        ('Thing', ['foobars.Thing', 'dohickies.Thing']),
+        (u'caf\xe9', ['foobars.cafe']),
+        ('empty', []),
+    ], [
+        ('pp', ['PewPew']),
+        ('t', ['Thing']),
+    ], [
+        'PewPew.foobars', 'Thing.dohickies', 'Thing.foobars',
+        u'caf\xe9.foobars',
+    ])
+    return fh.getvalue()
+
+
+class TestDjangoPack:
+
+    def test_header(self, pack_bytes):
+        django_pack = DjangoPack(pack_bytes)
+        assert django_pack.version == (1, 2, 3, 'final', 4)
+        assert django_pack.header['created'] == '2015-04-18T12:30:45'
+        assert django_pack.count == 4
+
+    def test_get_finds_names(self, pack_bytes):
+        django_pack = DjangoPack(pack_bytes)
+        assert django_pack.get('Thing') == ['foobars.Thing', 'dohickies.Thing']
+        assert django_pack.get('PewPew') == ['foobars.PewPew']
+        assert django_pack.get(u'caf\xe9') == ['foobars.cafe']
+        assert django_pack.get('empty') == []
+
+    def test_get_returns_default_for_missing_names(self, pack_bytes):
+        django_pack = DjangoPack(pack_bytes)
+        assert django_pack.get('Nope') is None
+        assert django_pack.get('Nope', []) == []
+        assert django_pack.get('A') is None
+        assert django_pack.get('zzz') is None
+        assert 'Thing' in django_pack
+        assert 'Nope' not in django_pack
+
+    def test_items_in_name_order(self, pack_bytes):
+        assert [name for name, _ in DjangoPack(pack_bytes).items()] == [
+            'PewPew', 'Thing', u'caf\xe9', 'empty']
+
+    def test_abbreviations_are_read_in_place(self, pack_bytes):
+        abbreviations = DjangoPack(pack_bytes).get_abbreviations()
+        assert abbreviations.get('pp') == ['PewPew']
+        assert abbreviations.get('t') == ['Thing']
+        assert abbreviations.get('x', []) == []
+
+    def test_suffixes_can_be_bisected(self, pack_bytes):
+        suffixes = DjangoPack(pack_bytes).get_suffixes()
+        assert len(suffixes) == 4
+        assert suffixes[1] == 'Thing.dohickies'
+        assert find_suffix(suffixes, 'foobars.Thing') == ['foobars.Thing']
+        assert find_suffix(suffixes, 'Thing') == [
+            'dohickies.Thing', 'foobars.Thing']
+        assert find_suffix(suffixes, 'foobars.Nope') == []
+        with pytest.raises(IndexError):
+            suffixes[4]
+
+    def test_rejects_older_formats(self, pack_bytes):
+        old = pack_bytes[:8] + struct.pack('<I', 1) + pack_bytes[12:]
+        with pytest.raises(DjangoIndexError) as errinfo:
+            DjangoPack(old)
+        assert errinfo.value.args == ('Unsupported index pack format 1', )
+
+    def test_rejects_other_files(self):
+        with pytest.raises(DjangoIndexError) as errinfo:
+            DjangoPack(b'{"data": {}, "version": [1, 2, 3]}')
+        assert errinfo.value.args == ('Not an index pack', )
+
+    def test_rejects_truncated_files(self):
+        with pytest.raises(DjangoIndexError) as errinfo:
+            DjangoPack(b'INDJ')
+        assert errinfo.value.args == ('Index pack is truncated', )
+
+    def test_from_filepath_maps_file(self, pack_bytes, tmpdir):
+        filepath = os.path.join(str(tmpdir), 'django.pack')
+        with open(filepath, 'wb') as fh:
+            fh.write(pack_bytes)
+        assert DjangoPack.from_filepath(filepath).get('PewPew') == ['foobars.PewPew']
+
+
+def test_write_pack_converts_json_index(djson, tmpdir, index_settings):
+    index_settings.INDEX_WRITER_BUFFER_SIZE = 1
+    filepath = os.path.join(str(tmpdir), 'django.pack')
+    assert write_pack(djson, filepath, index_settings) == filepath
+    django_pack = DjangoPack.from_filepath(filepath)
+    assert django_pack.version == (1, 2, 3, 'final', 4)
+    assert dict(django_pack.items()) == djson.get_index_data()
+    assert dict(django_pack.get_abbreviations().items()) == \
+        djson.get_abbreviations()
+    assert list(django_pack.get_suffixes()) == djson.get_suffixes()
+
+
+def test_pack_filename():
+    assert pack_filename((1, 2, 3, 'final', 4)) == 'django-1-2-3-final-4.pack'
+
+
+def test_read_packaged_reads_package_data():
+    assert read_packaged('test.json') == b'{"foo": "bar"}\n'
+    assert read_packaged('nope.pack') is None
+
+
+def test_read_packaged_reads_from_zip(pack_bytes, tmpdir, monkeypatch):
+    archive = os.path.join(str(tmpdir), 'bundle.zip')
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as zf:
+        zf.writestr('zippedindj/__init__.py', '')
+        zf.writestr('zippedindj/data/django-1-2-3-final-4.pack', pack_bytes)
+    monkeypatch.syspath_prepend(archive)
+    data = read_packaged('django-1-2-3-final-4.pack', package='zippedindj')
+    assert DjangoPack(data).get('PewPew') == ['foobars.PewPew']
+
+
+def test_load_packaged_without_bundle():
+    assert load_packaged((9, 9, 9, 'zeta', 9)) is None
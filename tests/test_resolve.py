@@ -0,0 +1,150 @@
+import ast
+import os
+from indj import resolve
+from indj.resolve import (
+    ImportResolver, _bound_names, find_undefined_names, import_statements)
+
+
+def test_find_undefined_names_returns_names_never_bound():
+    source = (
+        'import os\n'
+        'from django.db import models\n'
+        'class Thing(models.Model):\n'
+        '    def get(self, request, *args, **kwargs):\n'
+        '        value = [x for x in args]\n'
+        '        return HttpResponse(render(request, os.path, value))\n')
+    assert find_undefined_names(source) == ['HttpResponse', 'render']
+
+
+def test_find_undefined_names_ignores_builtins():
+    assert find_undefined_names('print(len(__file__), Thing)\n') == ['Thing']
+
+
+def test_find_undefined_names_counts_every_kind_of_binding():
+    source = (
+        'from a import b as c\n'
+        'import d.e\n'
+        'def f(g, h=1):\n'
+        '    global k\n'
+        '    try:\n'
+        '        pass\n'
+        '    except Exception as i:\n'
+        '        pass\n'
+        '    with open(g) as j:\n'
+        '        pass\n'
+        '    for l in h:\n'
+        '        pass\n'
+        'c, d, f, g, h, i, j, k, l, m\n')
+    assert find_undefined_names(source) == ['m']
+
+
+def test_find_undefined_names_binds_star_arguments():
+    source = 'def f(*args, **kw):\n    return args, kw\n'
+    assert find_undefined_names(source) == []
+
+
+def test_bound_names_reads_python_2_star_arguments():
+    arguments = ast.arguments(args=[], vararg='args', kwarg='kw', defaults=[])
+    assert _bound_names(arguments) == ['args', 'kw']
+
+
+def test_find_undefined_names_does_not_count_keywords_as_bindings():
+    assert find_undefined_names('foo(content=1)\nprint(content)\n') == [
+        'content', 'foo']
+
+
+def test_find_undefined_names_binds_import_aliases_not_originals():
+    source = 'from django.db import models as m\nimport os.path as p\nmodels.Q\nm, p\n'
+    assert find_undefined_names(source) == ['models']
+
+
+def test_find_undefined_names_gives_up_on_star_imports():
+    assert find_undefined_names('from django.db.models import *\nQ\n') == []
+
+
+def test_find_undefined_names_gives_up_on_syntax_errors():
+    assert find_undefined_names('print "pewpew"\n') == []
+
+
+def test_import_statements_groups_by_module():
+    statements = import_statements({
+        'render': 'django.shortcuts.render',
+        'redirect': 'django.shortcuts.redirect',
+        'models': 'django.db.models',
+        'django': 'django',
+    })
+    assert statements == [
+        'import django',
+        'from django.db import models',
+        'from django.shortcuts import redirect, render',
+    ]
+
+
+def test_import_statements_aliases_renamed_paths():
+    assert import_statements({'Resp': 'django.http.HttpResponse'}) == [
+        'from django.http import HttpResponse as Resp']
+
+
+class TestImportResolver:
+
+    def get_resolver(self, tmpdir, data_files, index_settings, workers):
+        output, package = data_files
+        index_settings.DATA_DIRECTORIES = [output, package]
+        project = os.path.join(str(tmpdir), 'project')
+        os.makedirs(os.path.join(project, 'app'))
+        with open(os.path.join(project, 'app', 'views.py'), 'w') as fh:
+            fh.write('def view():\n    return Thing(PewPew, Nope)\n')
+        with open(os.path.join(project, 'app', 'models.py'), 'w') as fh:
+            fh.write('class Model(Thing):\n    pass\n')
+        with open(os.path.join(project, 'app', 'test_views.py'), 'w') as fh:
+            fh.write('Thing\n')
+        return ImportResolver(
+            project, (1, 2, 3, 'final', 4), index_settings, workers=workers)
+
+    def test_get_filepaths_uses_exclusion_settings(self, tmpdir, data_files, index_settings):
+        resolver = self.get_resolver(tmpdir, data_files, index_settings, 1)
+        assert [os.path.basename(path) for path in resolver.get_filepaths()] == [
+            'models.py', 'views.py']
+
+    def test_resolve_in_process(self, tmpdir, data_files, index_settings):
+        resolver = self.get_resolver(tmpdir, data_files, index_settings, 1)
+        results = [(os.path.basename(path), statements, unresolved)
+                   for path, statements, unresolved in resolver.resolve()]
+        assert results == [
+            ('models.py', ['from foobars import Thing'], []),
+            ('views.py', ['from foobars import PewPew, Thing'], ['Nope']),
+        ]
+
+    def test_resolve_with_worker_pool(self, tmpdir, data_files, index_settings):
+        resolver = self.get_resolver(tmpdir, data_files, index_settings, 2)
+        results = [(os.path.basename(path), statements, unresolved)
+                   for path, statements, unresolved in resolver.resolve()]
+        assert results == [
+            ('models.py', ['from foobars import Thing'], []),
+            ('views.py', ['from foobars import PewPew, Thing'], ['Nope']),
+        ]
+
+    def test_resolve_with_worker_pool_sharing_index(self, tmpdir, data_files, index_settings):
+        index_settings.SHARED_INDEX = True
+        index_settings.SHARED_DIRECTORY = os.path.join(str(tmpdir), 'shared')
+        resolver = self.get_resolver(tmpdir, data_files, index_settings, 2)
+        results = [(os.path.basename(path), statements, unresolved)
+                   for path, statements, unresolved in resolver.resolve()]
+        assert results == [
+            ('models.py', ['from foobars import Thing'], []),
+            ('views.py', ['from foobars import PewPew, Thing'], ['Nope']),
+        ]
+        assert os.listdir(index_settings.SHARED_DIRECTORY) == [
+            'django-1-2-3-final-4.pack']
+
+    def test_resolve_loads_index_once_per_worker(self, tmpdir, data_files, index_settings, monkeypatch):
+        resolver = self.get_resolver(tmpdir, data_files, index_settings, 1)
+        loads = []
+        original = resolve.StackedLookupHandler.get_layer_data
+
+        def counting(self):
+            loads.append(len(self._layer_data))
+            return original(self)
+        monkeypatch.setattr(resolve.StackedLookupHandler, 'get_layer_data', counting)
+        list(resolver.resolve())
+        assert loads == [0, 1]
@@ -0,0 +1,109 @@
+import json
+import os
+import struct
+import pytest
+from indj import shared
+from indj.exceptions import DjangoIndexError
+from indj.settings import current_user
+from indj.index import DjangoJson
+
+
+@pytest.fixture
+def shared_settings(tmpdir, index_settings):
+    index_settings.SHARED_DIRECTORY = os.path.join(str(tmpdir), 'shared')
+    return index_settings
+
+
+def test_attach_without_published_pack_is_none(shared_settings):
+    assert shared.attach((1, 2, 3, 'final', 4), shared_settings) is None
+
+
+def test_publish_then_attach(djson, shared_settings):
+    filepath = shared.publish(djson, shared_settings)
+    assert filepath == os.path.join(
+        shared_settings.SHARED_DIRECTORY, 'django-1-2-3-final-4.pack')
+    django_pack = shared.attach((1, 2, 3, 'final', 4), shared_settings)
+    assert django_pack.get('Thing') == ['foobars.Thing', 'dohickies.Thing']
+    assert django_pack.get('Nope') is None
+    assert shared.attach((1, 2, 3, 'final', 4), shared_settings) is django_pack
+
+
+def test_publish_keeps_current_pack(djson, shared_settings, monkeypatch):
+    filepath = shared.publish(djson, shared_settings)
+    written = []
+    monkeypatch.setattr(shared, 'write_pack', lambda *args: written.append(args))
+    assert shared.publish(djson, shared_settings) == filepath
+    assert written == []
+
+
+def test_publish_replaces_pack_of_older_index(djson, mockjson, index_data,
+                                              shared_settings):
+    shared.publish(djson, shared_settings)
+    index_data['created'] = '2016-01-01T00:00:00'
+    index_data['data'] = {'Other': ['foobars.Other']}
+    with open(mockjson, 'w') as fh:
+        json.dump(index_data, fh)
+    shared.publish(DjangoJson(mockjson, shared_settings), shared_settings)
+    django_pack = shared.attach((1, 2, 3, 'final', 4), shared_settings)
+    assert django_pack.header['created'] == '2016-01-01T00:00:00'
+    assert django_pack.get('Other') == ['foobars.Other']
+
+
+def test_unpublish(djson, shared_settings):
+    shared.publish(djson, shared_settings)
+    assert shared.unpublish((1, 2, 3, 'final', 4), shared_settings) is True
+    assert shared.attach((1, 2, 3, 'final', 4), shared_settings) is None
+    assert shared.unpublish((1, 2, 3, 'final', 4), shared_settings) is False
+
+
+def test_publish_replaces_pack_in_older_format(djson, shared_settings):
+    filepath = shared.publish(djson, shared_settings)
+    shared._attached.clear()
+    with open(filepath, 'r+b') as fh:
+        fh.seek(8)
+        fh.write(struct.pack('<I', 1))
+    assert shared.attach((1, 2, 3, 'final', 4), shared_settings) is None
+    shared.publish(djson, shared_settings)
+    django_pack = shared.attach((1, 2, 3, 'final', 4), shared_settings)
+    assert django_pack.get('Thing') == ['foobars.Thing', 'dohickies.Thing']
+
+
+def test_shared_directory_is_per_user(index_settings):
+    assert os.path.basename(index_settings.SHARED_DIRECTORY) == \
+        'indj-{0}'.format(current_user())
+
+
+def test_publish_makes_private_directory(djson, shared_settings):
+    shared.publish(djson, shared_settings)
+    mode = os.stat(shared_settings.SHARED_DIRECTORY).st_mode
+    assert mode & 0o777 == 0o700
+    assert shared.is_private(shared_settings.SHARED_DIRECTORY)
+
+
+def test_attach_refuses_directories_others_can_write(djson, shared_settings):
+    shared.publish(djson, shared_settings)
+    shared._attached.clear()
+    os.chmod(shared_settings.SHARED_DIRECTORY, 0o777)
+    assert shared.attach((1, 2, 3, 'final', 4), shared_settings) is None
+    with pytest.raises(DjangoIndexError) as errinfo:
+        shared.publish(djson, shared_settings, overwrite=True)
+    assert errinfo.value.args == (
+        'Shared directory `{0}` is not private to this user'.format(
+            shared_settings.SHARED_DIRECTORY), )
+
+
+def test_attach_refuses_symlinked_directories(djson, shared_settings, tmpdir):
+    shared.publish(djson, shared_settings)
+    shared._attached.clear()
+    link = os.path.join(str(tmpdir), 'link')
+    os.symlink(shared_settings.SHARED_DIRECTORY, link)
+    shared_settings.SHARED_DIRECTORY = link
+    assert shared.attach((1, 2, 3, 'final', 4), shared_settings) is None
+
+
+def test_publish_turns_os_errors_into_index_errors(djson, shared_settings, tmpdir):
+    tmpdir.join('file').write('')
+    shared_settings.SHARED_DIRECTORY = os.path.join(str(tmpdir), 'file', 'shared')
+    with pytest.raises(DjangoIndexError) as errinfo:
+        shared.publish(djson, shared_settings)
+    assert errinfo.value.args[0].startswith('Could not publish to `')
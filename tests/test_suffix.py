@@ -0,0 +1,46 @@
+from indj.suffix import (
+    build_suffixes, find_suffix, rank_suffix_matches, reverse_path)
+
+
+def test_reverse_path():
+    assert reverse_path('django.db.models.Q') == 'Q.models.db.django'
+    assert reverse_path('Q') == 'Q'
+
+
+def test_build_suffixes_sorts_unique_reversed_paths():
+    assert build_suffixes([
+        'django.db.models.Q', 'django.http.Http404', 'django.db.models.Q',
+    ]) == ['Http404.http.django', 'Q.models.db.django']
+
+
+def test_find_suffix_matches_whole_components():
+    suffixes = build_suffixes([
+        'django.db.models.Q',
+        'django.db.models.query_utils.Q',
+        'django.contrib.gis.db.models.Q',
+        'django.db.othermodels.Q',
+        'models.Q',
+    ])
+    assert find_suffix(suffixes, 'models.Q') == [
+        'models.Q',
+        'django.db.models.Q',
+        'django.contrib.gis.db.models.Q']
+    assert find_suffix(suffixes, 'db.models.Q') == [
+        'django.db.models.Q', 'django.contrib.gis.db.models.Q']
+    assert find_suffix(suffixes, 'django.db.models.Q') == ['django.db.models.Q']
+    assert find_suffix(suffixes, 'odels.Q') == []
+    assert find_suffix(suffixes, 'shortcuts.Q') == []
+
+
+def test_rank_suffix_matches_puts_exact_matches_first():
+    paths = [
+        'django.forms.models.ModelForm',
+        'django.contrib.gis.forms.ModelForm',
+        'django.forms.ModelForm',
+        'django.views.ModelForm',
+    ]
+    exact = ['django.contrib.gis.forms.ModelForm', 'django.forms.ModelForm']
+    assert rank_suffix_matches('forms.ModelForm', exact, paths) == [
+        'django.contrib.gis.forms.ModelForm',
+        'django.forms.ModelForm',
+        'django.forms.models.ModelForm']
@@ -0,0 +1,80 @@
+import os
+import json
+import time
+from indj.index import DjangoJson
+
+
+def write_index(filepath, data):
+    with open(filepath, 'w') as fh:
+        json.dump({'data': data,
+                   'version': [1, 2, 3, 'final', 4],
+                   'created': '2015-04-18T12:30:45'}, fh)
+
+
+class TestDjangoTags:
+
+    def test__get_module_filepath_finds_module_file(self, tags):
+        filepath = tags._get_module_filepath('django.foobars.models')
+        assert filepath == os.path.join(
+            tags.src, 'foobars', 'models.py')
+
+    def test__get_module_filepath_finds_package_init(self, tags):
+        filepath = tags._get_module_filepath('django.foobars')
+        assert filepath == os.path.join(
+            tags.src, 'foobars', '__init__.py')
+
+    def test__get_module_filepath_falls_back_to_relative_path(self, tags):
+        tags.src = None
+        filepath = tags._get_module_filepath('django.foobars.models')
+        assert filepath == os.path.join('django', 'foobars', 'models.py')
+
+    def test__get_line_number_finds_definition(self, tags):
+        filepath = tags._get_module_filepath('django.foobars.models')
+        assert tags._get_line_number(filepath, 'processor_thing') == 1
+        assert tags._get_line_number(filepath, 'Thing') == 5
+
+    def test__get_line_number_defaults_to_first_line(self, tags):
+        filepath = tags._get_module_filepath('django.foobars.models')
+        assert tags._get_line_number(filepath, 'Nope') == 1
+
+    def test_tag_line(self, tags):
+        line = tags.tag_line('Thing', 'django.foobars.models.Thing')
+        filepath = os.path.join(
+            tags.src, 'foobars', 'models.py')
+        assert line == 'Thing\t{0}\t5;"\timport:django.foobars.models.Thing\n'.format(filepath)
+
+    def test_write_creates_sorted_tags_file(self, tags, tmpdir):
+        tags.settings.INDEX_WRITER_BUFFER_SIZE = 2
+        index_filepath = os.path.join(str(tmpdir), 'django-1-2-3-final-4.json')
+        write_index(index_filepath, {
+            'Thing': ['django.foobars.models.Thing', 'django.foobars.Thing'],
+            'That': ['django.foobars.That'],
+            'processor_thing': ['django.foobars.models.processor_thing']})
+        assert tags.write(DjangoJson(index_filepath, tags.settings)) is True
+        lines = open(tags.filepath).read().splitlines()
+        assert lines == sorted(lines)
+        names = [line.split('\t')[0] for line in lines if not line.startswith('!')]
+        assert names == ['That', 'Thing', 'Thing', 'processor_thing']
+        assert lines[-3].endswith('import:django.foobars.Thing')
+        assert lines[-2].endswith('import:django.foobars.models.Thing')
+
+    def test_write_skips_when_index_is_unchanged(self, tags, tmpdir):
+        index_filepath = os.path.join(str(tmpdir), 'django-1-2-3-final-4.json')
+        write_index(index_filepath, {'Thing': ['django.foobars.models.Thing']})
+        djson = DjangoJson(index_filepath, tags.settings)
+        assert tags.write(djson) is True
+        assert tags.is_current(index_filepath)
+        assert tags.write(djson) is False
+        assert tags.write(djson, overwrite=True) is True
+
+    def test_write_regenerates_when_index_changes(self, tags, tmpdir):
+        index_filepath = os.path.join(str(tmpdir), 'django-1-2-3-final-4.json')
+        write_index(index_filepath, {'Thing': ['django.foobars.models.Thing']})
+        tags.write(DjangoJson(index_filepath, tags.settings))
+        write_index(index_filepath, {'That': ['django.foobars.That'],
+                                     'Thing': ['django.foobars.models.Thing']})
+        later = time.time() + 10
+        os.utime(index_filepath, (later, later))
+        assert not tags.is_current(index_filepath)
+        assert tags.write(DjangoJson(index_filepath, tags.settings)) is True
+        assert 'That\t' in open(tags.filepath).read()
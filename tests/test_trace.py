@@ -0,0 +1,118 @@
+import json
+import os
+from indj import trace
+
+
+class TestTracer:
+
+    def test_span_does_nothing_when_disabled(self):
+        tracer = trace.Tracer()
+        with tracer.span('thing'):
+            pass
+        assert tracer.spans == []
+
+    def test_span_records_time_without_tracing_memory(self):
+        tracer = trace.Tracer()
+        tracer.start()
+        try:
+            with tracer.span('thing'):
+                if trace.tracemalloc is not None:
+                    assert not trace.tracemalloc.is_tracing()
+        finally:
+            tracer.stop()
+        name, seconds, allocated = tracer.spans[0]
+        assert seconds >= 0
+        assert allocated == 0
+        assert tracer.breakdown().splitlines()[0].split() == ['phase', 'ms']
+
+    def test_span_records_time_and_allocations(self):
+        tracer = trace.Tracer()
+        tracer.start(memory=True)
+        try:
+            with tracer.span('thing'):
+                data = [object() for _ in range(1000)]
+        finally:
+            tracer.stop()
+        assert len(data) == 1000
+        assert len(tracer.spans) == 1
+        name, seconds, allocated = tracer.spans[0]
+        assert name == 'thing'
+        assert seconds >= 0
+        if trace.tracemalloc is not None:
+            assert allocated > 0
+
+    def test_span_records_even_when_raising(self):
+        tracer = trace.Tracer()
+        tracer.start()
+        try:
+            with tracer.span('thing'):
+                raise ValueError('lol')
+        except ValueError:
+            pass
+        finally:
+            tracer.stop()
+        assert [name for name, _, _ in tracer.spans] == ['thing']
+
+    def test_breakdown_lists_spans(self):
+        tracer = trace.Tracer()
+        tracer.start(memory=True)
+        tracer.add('parse', 0.0125, 2048)
+        tracer.stop()
+        lines = tracer.breakdown().splitlines()
+        assert lines[1].split() == ['parse', '12.500', '2.0']
+
+    def test_record_appends_to_stats_file(self, tmpdir):
+        filepath = os.path.join(str(tmpdir), 'stats', 'stats.jsonl')
+        tracer = trace.Tracer()
+        tracer.start()
+        tracer.add('parse', 0.5, 10)
+        tracer.record(filepath, 1024, version='1-2-3', format='json')
+        tracer.record(filepath, 1024, version='1-2-3', format='json')
+        records = trace.load_records(filepath)
+        assert len(records) == 2
+        assert records[0]['spans'] == {'parse': 0.5}
+        assert records[0]['version'] == '1-2-3'
+
+    def test_record_drops_oldest_records_when_too_big(self, tmpdir):
+        filepath = os.path.join(str(tmpdir), 'stats.jsonl')
+        tracer = trace.Tracer()
+        tracer.start()
+        tracer.add('parse', 0.5)
+        for i in range(20):
+            tracer.record(filepath, 1000, run=i)
+        records = trace.load_records(filepath)
+        assert os.path.getsize(filepath) <= 1000
+        assert records[-1]['run'] == 19
+
+
+def test_load_records_skips_broken_lines(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'stats.jsonl')
+    with open(filepath, 'w') as fh:
+        fh.write(json.dumps({'spans': {}}) + '\n{"spans": \n')
+    assert trace.load_records(filepath) == [{'spans': {}}]
+
+
+def test_load_records_without_file(tmpdir):
+    assert trace.load_records(os.path.join(str(tmpdir), 'nope')) == []
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert trace.percentile(values, 50) == 50
+    assert trace.percentile(values, 95) == 95
+    assert trace.percentile(values, 99) == 99
+    assert trace.percentile([3], 99) == 3
+    assert trace.percentile([], 50) is None
+
+
+def test_summarise_groups_by_version_format_and_phase():
+    records = [
+        {'version': '1-8', 'format': 'json', 'spans': {'parse': 0.1, 'index': 0.01}},
+        {'version': '1-8', 'format': 'json', 'spans': {'parse': 0.3}},
+        {'version': '1-7', 'format': 'json', 'spans': {'parse': 0.2}},
+    ]
+    assert trace.summarise(records) == [
+        ('1-7', 'json', 'parse', 1, 0.2, 0.2, 0.2),
+        ('1-8', 'json', 'index', 1, 0.01, 0.01, 0.01),
+        ('1-8', 'json', 'parse', 2, 0.1, 0.3, 0.3),
+    ]
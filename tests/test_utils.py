@@ -1,4 +1,5 @@
 import re
+import os
 import json
 import datetime
 import pytest
@@ -43,6 +44,27 @@ def test_version_as_string_returns_correct_string():
     assert utils.version_as_string(version) == '1-2-3-final-4'
 
 
+def test_version_from_string_returns_version_tuple():
+    assert utils.version_from_string('1-2-3-final-4') == (1, 2, 3, 'final', 4)
+
+
+def test_version_sort_key_orders_release_levels():
+    versions = [
+        (1, 8, 0, 'final', 0),
+        (1, 8, 0, 'rc', 1),
+        (1, 7, 2, 'final', 0),
+        (1, 8, 0, 'alpha', 1),
+        (1, 8, 0, 'beta', 2),
+    ]
+    assert sorted(versions, key=utils.version_sort_key) == [
+        (1, 7, 2, 'final', 0),
+        (1, 8, 0, 'alpha', 1),
+        (1, 8, 0, 'beta', 2),
+        (1, 8, 0, 'rc', 1),
+        (1, 8, 0, 'final', 0),
+    ]
+
+
 def test_data_filepath_from_version_joins_version_tuple_and_directory():
     version = (1, 2, 3, 'final', 4)
     filepath = utils.data_filepath_from_version('/foobar', version)
@@ -74,3 +96,76 @@ def test_json_serialize_raises_exception_with_unkown_instance():
         thing_type=type(Thing()))
 
     assert errinfo.value.args == (expected_error, )
+
+
+def test_file_signature_sees_changes_within_a_second(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'thing.json')
+    with open(filepath, 'w') as fh:
+        fh.write('pewpew')
+    os.utime(filepath, (1000000000.25, 1000000000.25))
+    before = utils.file_signature(filepath)
+    os.utime(filepath, (1000000000.5, 1000000000.5))
+    assert utils.file_signature(filepath) != before
+
+
+def test_atomic_open_moves_file_into_place(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'thing.json')
+    with utils.atomic_open(filepath) as fh:
+        fh.write('pewpew')
+        assert not os.path.exists(filepath)
+    assert open(filepath).read() == 'pewpew'
+    assert os.listdir(str(tmpdir)) == ['thing.json']
+
+
+def test_atomic_open_removes_temporary_file_on_error(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'thing.json')
+    with pytest.raises(ValueError):
+        with utils.atomic_open(filepath) as fh:
+            fh.write('pewpew')
+            raise ValueError('lol')
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_atomic_open_follows_umask(tmpdir):
+    filepath = os.path.join(str(tmpdir), 'thing.json')
+    umask = os.umask(0o022)
+    try:
+        with utils.atomic_open(filepath) as fh:
+            fh.write('pewpew')
+    finally:
+        os.umask(umask)
+    assert os.stat(filepath).st_mode & 0o777 == 0o644
+
+
+def test_current_umask_leaves_process_umask_alone(monkeypatch):
+    umask = utils._read_umask()
+    monkeypatch.setattr(os, 'umask', lambda mask: pytest.fail('umask was set'))
+    assert utils.current_umask() == umask
+
+
+def test_current_umask_without_proc_is_umask_at_import(monkeypatch):
+    def no_proc(*args):
+        raise IOError('No such file or directory')
+    monkeypatch.setattr(utils, 'open', no_proc, raising=False)
+    monkeypatch.setattr(utils, '_umask', 0o027)
+    assert utils.current_umask() == 0o027
+
+
+def test_read_django_version_reads_source_without_importing(tmpdir):
+    tmpdir.join('__init__.py').write(
+        'from x import y\nVERSION = (1, 8, 4, \'final\', 0)\n')
+    assert utils.read_django_version(str(tmpdir)) == (1, 8, 4, 'final', 0)
+
+
+def test_read_django_version_returns_none_without_version(tmpdir):
+    tmpdir.join('__init__.py').write('import os\n')
+    assert utils.read_django_version(str(tmpdir)) is None
+
+
+def test_version_from_release_returns_version_tuple():
+    assert utils.version_from_release('1.8.4') == (1, 8, 4, 'final', 0)
+    assert utils.version_from_release('1.9') == (1, 9, 0, 'final', 0)
+    assert utils.version_from_release('1.9rc1') == (1, 9, 0, 'rc', 1)
+    assert utils.version_from_release('1.10b2') == (1, 10, 0, 'beta', 2)
+    assert utils.version_from_release('2.0.dev1') == (2, 0, 0, 'alpha', 0)
+    assert utils.version_from_release('nonsense') is None
@@ -0,0 +1,138 @@
+import os
+import re
+import time
+from indj import index
+from indj.index import DjangoJson
+from indj.watch import InotifyMonitor, PollingMonitor, get_monitor
+
+
+def touch(path, contents):
+    with open(path, 'w') as fh:
+        fh.write(contents)
+    later = time.time() + 10
+    os.utime(path, (later, later))
+
+
+class TestDjangoWatcher:
+
+    def test_build_indexes_every_file(self, watcher):
+        index = watcher.build()
+        assert index.data['Thing'] == ['django.foobars.models.Thing']
+        assert index.data['That'] == ['django.foobars.That']
+        assert index.version == (1, 2, 3, 'final', 4)
+
+    def test_update_without_changes_does_nothing(self, watcher, monkeypatch):
+        watcher.build()
+        extracted = []
+        monkeypatch.setattr(watcher, '_extract', extracted.append)
+        assert watcher.update() == []
+        assert extracted == []
+
+    def test_update_reextracts_modified_files(self, watcher):
+        watcher.build()
+        models = os.path.join(watcher.src, 'foobars', 'models.py')
+        touch(models, 'class Other:\n    pass\n')
+        assert watcher.update() == [models]
+        assert 'Thing' not in watcher.index.data
+        assert watcher.index.data['Other'] == ['django.foobars.models.Other']
+        assert watcher.index.data['That'] == ['django.foobars.That']
+
+    def test_update_adds_new_files(self, watcher):
+        watcher.build()
+        views = os.path.join(watcher.src, 'foobars', 'views.py')
+        touch(views, 'def render():\n    pass\n')
+        watcher.update()
+        assert watcher.index.data['render'] == ['django.foobars.views.render']
+
+    def test_update_removes_deleted_files(self, watcher):
+        watcher.build()
+        models = os.path.join(watcher.src, 'foobars', 'models.py')
+        os.remove(models)
+        assert watcher.update() == [models]
+        assert 'Thing' not in watcher.index.data
+        assert 'processor_thing' not in watcher.index.data
+
+    def test_update_keeps_paths_other_files_still_give(self, watcher, monkeypatch):
+        definitions = watcher.django_src._get_definitions_from_file
+
+        def with_imports(path):
+            # imports give the path of the module they import from
+            found = definitions(path)
+            with open(path) as fh:
+                if 'from .models import Thing' in fh.read():
+                    found.append(('Thing', 'django.foobars.models.Thing'))
+            return found
+        monkeypatch.setattr(
+            watcher.django_src, '_get_definitions_from_file', with_imports)
+        init = os.path.join(watcher.src, 'foobars', '__init__.py')
+        with open(init) as fh:
+            contents = fh.read()
+        touch(init, contents + 'from .models import Thing\n')
+        watcher.build()
+        touch(init, contents)
+        assert watcher.update() == [init]
+        assert watcher.index.data['Thing'] == ['django.foobars.models.Thing']
+
+    def test_ranks_defining_module_first_after_other_files_are_read(self, watcher, monkeypatch):
+        class Definition(object):
+            def __init__(self, name):
+                self.name = self.full_name = name
+
+        class FakeJedi(object):
+            @staticmethod
+            def defined_names(source):
+                return [Definition(name) for name in re.findall(
+                    r'(?:class|import)\s+(\w+)', source)]
+        monkeypatch.setattr(index, 'jedi', FakeJedi)
+        monkeypatch.delattr(watcher.django_src, '_get_definitions_from_file')
+        importer = os.path.join(watcher.src, 'foobars', 'a.py')
+        touch(importer, 'from .b import X\n')
+        touch(os.path.join(watcher.src, 'foobars', 'b.py'), 'class X:\n    pass\n')
+        watcher.build()
+        assert watcher.index.data['X'] == [
+            'django.foobars.b.X', 'django.foobars.a.X']
+        touch(importer, 'from .b import X\n\n')
+        assert watcher.update() == [importer]
+        assert watcher.index.data['X'] == [
+            'django.foobars.b.X', 'django.foobars.a.X']
+
+    def test_run_saves_patched_index(self, watcher):
+        watcher.build()
+        models = os.path.join(watcher.src, 'foobars', 'models.py')
+        touch(models, 'class Other:\n    pass\n')
+        watcher.run(iterations=1)
+        filepath = os.path.join(
+            watcher.settings.JSON_OUTPUT_DIRECTORY, 'django-1-2-3-final-4.json')
+        data = DjangoJson(filepath, watcher.settings).get_index_data()
+        assert data['Other'] == ['django.foobars.models.Other']
+        assert 'Thing' not in data
+
+    def test_run_builds_and_saves_index_first(self, watcher):
+        watcher.run(iterations=0)
+        filepath = os.path.join(
+            watcher.settings.JSON_OUTPUT_DIRECTORY, 'django-1-2-3-final-4.json')
+        assert os.path.exists(filepath)
+
+
+class TestMonitors:
+
+    def test_get_monitor_falls_back_to_polling(self, index_settings, monkeypatch):
+        def broken(settings):
+            raise OSError('nope')
+        monkeypatch.setattr('indj.watch.InotifyMonitor', broken)
+        assert isinstance(get_monitor(index_settings), PollingMonitor)
+
+    def test_inotify_monitor_sees_changes(self, index_settings, tmpdir):
+        try:
+            monitor = InotifyMonitor(index_settings)
+        except (AttributeError, OSError, TypeError):
+            return
+        try:
+            monitor.watch([str(tmpdir)])
+            assert monitor.wait(0) is False
+            touch(os.path.join(str(tmpdir), 'thing.py'), 'pass')
+            assert monitor.wait(1) is True
+            monitor.settle(0)
+            assert monitor.wait(0) is False
+        finally:
+            monitor.close()